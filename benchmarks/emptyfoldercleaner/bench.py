@@ -0,0 +1,259 @@
+"""
+空文件夹清理插件基准测试
+
+在合成目录树上以模拟运行/实际运行两种模式执行插件清理流程，记录耗时、系统调用次数与内存峰值。
+每次测量在独立子进程中执行，结果以 JSONL 追加保存，可与其它提交的结果对比。
+
+示例：
+    python benchmarks/emptyfoldercleaner/bench.py --dirs 100000 --depth 6 --fanout 8 --repeat 3 \\
+        --output bench.jsonl --baseline bench_base.jsonl --set max_workers=4
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+FAKEAPP_DIR = os.path.join(BENCH_DIR, "fakeapp")
+PLUGINS_DIR = os.path.join(REPO_DIR, "plugins.v2")
+
+sys.path.insert(0, BENCH_DIR)
+from treegen import EXCLUDE_NAME, TreeSpec, generate_tree  # noqa: E402
+
+# 统计的系统调用
+_COUNTED_CALLS = ("scandir", "open", "stat", "lstat", "fstat", "rmdir")
+# 对比的指标
+_METRICS = ("wall_seconds", "syscalls", "dirs_listed", "peak_rss_kb", "removed_count")
+
+
+class SyscallCounter:
+    """
+    替换 os 模块中的文件系统函数以统计调用次数
+    须在插件导入之后启用，避免影响插件导入时对 os.supports_fd 等的判断
+    """
+
+    def __init__(self):
+        self.counts = {name: 0 for name in _COUNTED_CALLS}
+        self._originals = {}
+
+    def __wrap(self, name: str):
+        original = self._originals[name]
+        counts = self.counts
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return original(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        for name in _COUNTED_CALLS:
+            self._originals[name] = getattr(os, name)
+            setattr(os, name, self.__wrap(name))
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(os, name, original)
+
+
+def _peak_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回KB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_worker(root: str, mode: str, config: Dict[str, Any], trace_memory: bool,
+               plugins_dir: str = PLUGINS_DIR) -> Dict[str, Any]:
+    """
+    子进程中执行一次插件清理并返回指标
+    """
+    sys.path[:0] = [FAKEAPP_DIR, plugins_dir]
+    from emptyfoldercleaner import EmptyFolderCleaner
+
+    plugin = EmptyFolderCleaner()
+    plugin.init_plugin({
+        "target_dirs": root,
+        "exclude_dirs": EXCLUDE_NAME,
+        "recursive": True,
+        **config,
+        "enabled": False,
+        "onlyonce": False,
+        "dry_run": mode == "dry",
+    })
+
+    if trace_memory:
+        tracemalloc.start()
+    with SyscallCounter() as counter:
+        start = time.perf_counter()
+        plugin.clean_empty_folders()
+        wall_seconds = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+
+    # 新版本的清理历史通过分页接口读取，旧版本保存在 history 列表中
+    if hasattr(plugin, "get_history"):
+        last_run = (plugin.get_history(1, 1)["data"]["items"] or [{}])[0]
+    else:
+        last_run = (plugin.get_data("history") or [{}])[-1]
+    return {
+        "wall_seconds": round(wall_seconds, 4),
+        "syscalls": sum(counter.counts.values()),
+        "calls": counter.counts,
+        "dirs_listed": counter.counts["scandir"],
+        "peak_rss_kb": _peak_rss_kb(),
+        "traced_peak_kb": traced_peak // 1024 if traced_peak is not None else None,
+        "removed_count": last_run.get("removed_count"),
+    }
+
+
+def _spawn_worker(root: str, mode: str, config: Dict[str, Any], trace_memory: bool,
+                  plugins_dir: str, data_dir: str) -> Dict[str, Any]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--root", root, "--mode", mode,
+           "--config-json", json.dumps(config), "--plugins-dir", plugins_dir]
+    if trace_memory:
+        cmd.append("--tracemalloc")
+    env = {**os.environ, "BENCH_PLUGIN_DATA_PATH": data_dir}
+    output = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git_commit(plugins_dir: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=plugins_dir, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _scenario_key(record: Dict[str, Any]) -> str:
+    return json.dumps([record["spec"], record["mode"], record["config"]], sort_keys=True)
+
+
+def _parse_config(items: List[str]) -> Dict[str, Any]:
+    """
+    解析 --set key=value，值按 JSON 解析，失败时作为字符串
+    """
+    config = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value
+    return config
+
+
+def _load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    baseline = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[_scenario_key(record)] = record
+    return baseline
+
+
+def _print_record(record: Dict[str, Any], base: Optional[Dict[str, Any]]):
+    title = f"[{record['mode']}] commit={record['commit']} config={record['config']}"
+    if base:
+        title += f"  对比 commit={base['commit']}"
+    print(title)
+    for metric in _METRICS:
+        value = record["median"].get(metric)
+        line = f"  {metric:<15}{value}"
+        if base and base["median"].get(metric):
+            base_value = base["median"][metric]
+            line += f"  基线 {base_value}  比值 {value / base_value:.2f}x" if value is not None else ""
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="空文件夹清理插件基准测试")
+    parser.add_argument("--dirs", type=int, default=10000, help="目录总数")
+    parser.add_argument("--depth", type=int, default=6, help="最大深度")
+    parser.add_argument("--fanout", type=int, default=8, help="每个目录的子目录数")
+    parser.add_argument("--empty-ratio", type=float, default=0.5, help="空叶子目录比例")
+    parser.add_argument("--file-ratio", type=float, default=0.1, help="非叶子目录包含文件的比例")
+    parser.add_argument("--exclude-ratio", type=float, default=0.0, help="排除目录比例")
+    parser.add_argument("--flat-dirs", type=int, default=0, help="平铺大目录数量")
+    parser.add_argument("--flat-entries", type=int, default=10000, help="平铺大目录中的文件数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--mode", choices=["dry", "real", "both"], default="both", help="运行模式")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式重复次数，取中位数")
+    parser.add_argument("--set", dest="config", action="append", default=[],
+                        help="插件配置覆盖，如 max_workers=4，可多次指定")
+    parser.add_argument("--workdir", help="生成目录树的位置，默认使用临时目录")
+    parser.add_argument("--data-dir", help="插件数据目录（清理历史、目录索引等），默认每个场景使用一个临时目录，结束后删除")
+    parser.add_argument("--output", help="结果追加写入的 JSONL 文件")
+    parser.add_argument("--baseline", help="基线结果 JSONL 文件，输出对比")
+    parser.add_argument("--tracemalloc", action="store_true", help="同时统计 Python 内存分配峰值（较慢）")
+    parser.add_argument("--plugins-dir", default=PLUGINS_DIR,
+                        help="插件目录，可指向其它提交的 git worktree 中的 plugins.v2 以生成基线")
+    # 子进程参数
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    parser.add_argument("--config-json", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.root, args.mode, json.loads(args.config_json), args.tracemalloc,
+                                    os.path.abspath(args.plugins_dir))))
+        return
+
+    spec = TreeSpec(dirs=args.dirs, depth=args.depth, fanout=args.fanout, empty_ratio=args.empty_ratio,
+                    file_ratio=args.file_ratio, exclude_ratio=args.exclude_ratio, flat_dirs=args.flat_dirs,
+                    flat_entries=args.flat_entries, seed=args.seed)
+    config = _parse_config(args.config)
+    baseline = _load_baseline(args.baseline) if args.baseline else {}
+    plugins_dir = os.path.abspath(args.plugins_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_emptyfolder_")
+    root = os.path.join(workdir, "tree")
+    modes = ["dry", "real"] if args.mode == "both" else [args.mode]
+
+    try:
+        for mode in modes:
+            runs = []
+            tree_stats = None
+            # 同一场景的各次运行共用插件数据目录
+            data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_plugin_data_")
+            try:
+                for i in range(args.repeat):
+                    # 实际运行会删除目录，每次重新生成；模拟运行复用同一棵树
+                    if tree_stats is None or mode == "real":
+                        tree_stats = generate_tree(root, spec)
+                    runs.append(_spawn_worker(root, mode, config, args.tracemalloc, plugins_dir, data_dir))
+            finally:
+                if not args.data_dir:
+                    shutil.rmtree(data_dir, ignore_errors=True)
+            record = {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "commit": _git_commit(plugins_dir),
+                "spec": spec.to_dict(),
+                "tree": tree_stats,
+                "mode": mode,
+                "config": config,
+                "runs": runs,
+                "median": {metric: round(statistics.median(run[metric] for run in runs), 4)
+                           for metric in _METRICS if all(run.get(metric) is not None for run in runs)},
+            }
+            _print_record(record, baseline.get(_scenario_key(record)))
+            if args.output:
+                with open(args.output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+MoviePilot 运行环境的最小替身，仅用于在主程序之外运行插件基准测试
+"""
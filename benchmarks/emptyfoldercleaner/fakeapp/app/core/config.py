@@ -0,0 +1,26 @@
+import atexit
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def _plugin_data_path() -> Path:
+    """
+    插件数据目录，由 bench.py 通过 BENCH_PLUGIN_DATA_PATH 指定；未指定时使用临时目录，进程退出时删除
+    """
+    path = os.environ.get("BENCH_PLUGIN_DATA_PATH")
+    if path:
+        return Path(path)
+    path = tempfile.mkdtemp(prefix="bench_plugin_data_")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return Path(path)
+
+
+class Settings:
+    TZ = os.environ.get("TZ", "Asia/Shanghai")
+    API_TOKEN = "benchmark"
+    PLUGIN_DATA_PATH = _plugin_data_path()
+
+
+settings = Settings()
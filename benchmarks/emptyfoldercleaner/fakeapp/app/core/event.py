@@ -0,0 +1,27 @@
+from typing import Any, Callable, Dict, Optional
+
+
+class Event:
+    """
+    事件替身
+    """
+
+    def __init__(self, event_type: Any, event_data: Optional[Dict] = None):
+        self.event_type = event_type
+        self.event_data = event_data or {}
+
+
+class EventManager:
+    """
+    事件管理器替身，注册装饰器不做任何处理
+    """
+
+    @staticmethod
+    def register(etype: Any) -> Callable:
+        def decorator(func: Callable) -> Callable:
+            return func
+
+        return decorator
+
+
+eventmanager = EventManager()
@@ -0,0 +1,39 @@
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+
+class _PluginBase:
+    """
+    插件基类替身，数据保存在内存中，消息只计数不发送
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._config = {}
+        self.messages = []
+
+    def get_data(self, key: str = None, plugin_id: str = None) -> Any:
+        return self._data.get(key)
+
+    def save_data(self, key: str, value: Any, plugin_id: str = None):
+        self._data[key] = value
+
+    def del_data(self, key: str, plugin_id: str = None) -> Any:
+        return self._data.pop(key, None)
+
+    def get_config(self, plugin_id: str = None) -> dict:
+        return self._config
+
+    def update_config(self, config: dict, plugin_id: str = None) -> bool:
+        self._config = config
+        return True
+
+    def get_data_path(self, plugin_id: str = None) -> Path:
+        data_path = settings.PLUGIN_DATA_PATH / (plugin_id or self.__class__.__name__).lower()
+        data_path.mkdir(parents=True, exist_ok=True)
+        return data_path
+
+    def post_message(self, **kwargs):
+        self.messages.append(kwargs)
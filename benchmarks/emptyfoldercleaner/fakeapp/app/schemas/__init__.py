@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class NotificationType(Enum):
+    SiteMessage = "站点消息"
+    Plugin = "插件"
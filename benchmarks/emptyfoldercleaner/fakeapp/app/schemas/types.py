@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class EventType(Enum):
+    TransferComplete = "transfer.complete"
+    DownloadFileDeleted = "downloadfile.deleted"
+    PluginAction = "plugin.action"
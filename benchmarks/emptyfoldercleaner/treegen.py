@@ -0,0 +1,108 @@
+import os
+import random
+import shutil
+from collections import deque
+from typing import Any, Dict
+
+# 生成树中用于命中排除规则的目录名
+EXCLUDE_NAME = "@eaDir"
+
+
+class TreeSpec:
+    """
+    合成目录树参数
+    """
+
+    def __init__(self,
+                 dirs: int = 10000,
+                 depth: int = 6,
+                 fanout: int = 8,
+                 empty_ratio: float = 0.5,
+                 file_ratio: float = 0.1,
+                 exclude_ratio: float = 0.0,
+                 flat_dirs: int = 0,
+                 flat_entries: int = 10000,
+                 seed: int = 0):
+        """
+        :param dirs: 目录总数（不含根目录与平铺目录）
+        :param depth: 最大深度
+        :param fanout: 每个目录的子目录数
+        :param empty_ratio: 叶子目录为空的比例，其余叶子目录包含一个文件
+        :param file_ratio: 非叶子目录直接包含文件的比例
+        :param exclude_ratio: 子目录命名为排除目录的比例
+        :param flat_dirs: 平铺大目录数量，位于根目录下
+        :param flat_entries: 每个平铺大目录中的文件数
+        :param seed: 随机种子，相同参数生成相同的目录树
+        """
+        self.dirs = dirs
+        self.depth = depth
+        self.fanout = fanout
+        self.empty_ratio = empty_ratio
+        self.file_ratio = file_ratio
+        self.exclude_ratio = exclude_ratio
+        self.flat_dirs = flat_dirs
+        self.flat_entries = flat_entries
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def generate_tree(root: str, spec: TreeSpec) -> Dict[str, int]:
+    """
+    按参数广度优先生成目录树，root 已存在时先删除
+    返回: 生成统计
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+
+    rnd = random.Random(spec.seed)
+    stats = {"dirs": 0, "leaves": 0, "empty_leaves": 0, "files": 0, "excluded": 0}
+
+    # 广度优先创建目录，记录每个目录是否有子目录
+    queue = deque([(root, 0)])
+    created = []
+    while queue and stats["dirs"] < spec.dirs:
+        path, level = queue.popleft()
+        if level >= spec.depth:
+            continue
+        excluded = rnd.random() < spec.exclude_ratio
+        for i in range(spec.fanout):
+            if stats["dirs"] >= spec.dirs:
+                break
+            if excluded and i == 0:
+                name = EXCLUDE_NAME
+                stats["excluded"] += 1
+            else:
+                name = f"d{i:03d}"
+            child = os.path.join(path, name)
+            os.mkdir(child)
+            stats["dirs"] += 1
+            created.append(child)
+            queue.append((child, level + 1))
+
+    # 没有子目录的是叶子目录
+    parents = {os.path.dirname(path) for path in created}
+    for path in created:
+        if path in parents:
+            if rnd.random() < spec.file_ratio:
+                open(os.path.join(path, "file.bin"), "w").close()
+                stats["files"] += 1
+            continue
+        stats["leaves"] += 1
+        if rnd.random() < spec.empty_ratio:
+            stats["empty_leaves"] += 1
+        else:
+            open(os.path.join(path, "file.bin"), "w").close()
+            stats["files"] += 1
+
+    # 平铺大目录，用于衡量遇到文件后提前结束判定的效果
+    for i in range(spec.flat_dirs):
+        flat_dir = os.path.join(root, f"flat{i:03d}")
+        os.mkdir(flat_dir)
+        for j in range(spec.flat_entries):
+            open(os.path.join(flat_dir, f"f{j:06d}.bin"), "w").close()
+        stats["files"] += spec.flat_entries
+
+    return stats
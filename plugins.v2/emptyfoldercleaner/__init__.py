@@ -1,18 +1,40 @@
+import hashlib
 import os
-import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from threading import Event
-from typing import Any, List, Dict, Tuple, Optional
+from threading import Event as ThreadEvent
+from typing import Any, List, Dict, Tuple, Optional, Set, Iterator
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.core.config import settings
+from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import NotificationType
+from app.schemas.types import EventType
+
+from .coordinator import RunCoordinator
+from .exclusion import ExcludeMatcher
+from .history import HistoryStore, RemovedPathLog
+from .index import DirectoryIndex
+from .jobs import CleanJob, JobQueue
+from .metrics import RssSampler, ScanStats
+from .mounts import find_boundaries, parse_fs_types
+from .plan import RootPlan, build_root_plan
+from .profiler import RunProfiler, list_profiles
+from .progress import RunProgress
+from .quarantine import Quarantine
+from .report import ReportWriter, list_reports, read_report
+from .scanner import EmptyFolderScanner, WalkCursor
+from .storage import StorageScanner, open_storage
+from .throttle import IoThrottle
+from .watcher import Debouncer, FolderWatcher
+from .optimeout import Watchdog
 
 
 class EmptyFolderCleaner(_PluginBase):
@@ -23,7 +45,7 @@ class EmptyFolderCleaner(_PluginBase):
     # 插件图标
     plugin_icon = "clean.png"
     # 插件版本
-    plugin_version = "1.1"
+    plugin_version = "3.3"
     # 插件作者
     plugin_author = "oriecho"
     # 作者主页
@@ -46,8 +68,76 @@ class EmptyFolderCleaner(_PluginBase):
     _recursive = True
     _exclude_dirs = None
     _dry_run = False
+    # 并发线程数，1为顺序执行
+    _max_workers = 1
+    # 增量扫描
+    _incremental = False
+    # 每隔多少次增量扫描执行一次全量扫描
+    _full_scan_interval = 10
+    # 单次运行时长上限（分钟），0为不限制
+    _max_runtime = 0
+    # 实时监控模式：空为关闭，native 原生监控，polling 轮询
+    _watch_mode = ""
+    # 实时监控与事件触发的防抖时间（秒）
+    _watch_debounce = 10
+    # 整理完成、删除下载文件后清理源目录
+    _event_trigger = False
+    # 每秒列出目录数上限，0为不限制
+    _io_rate = 0
+    # 同时进行的文件系统操作数上限，0为不限制
+    _io_concurrency = 0
+    # 根据列出延迟自动退避
+    _io_adaptive = False
+    # 按清理目录单独设置的限速
+    _io_limits = None
+    # 只清理清理目录所在的文件系统，不进入其下的挂载点
+    _one_filesystem = False
+    # 不进入的文件系统类型
+    _skip_fs_types = None
+    # 空文件夹最短保留时间（分钟），修改时间在此之内的暂不删除
+    _min_age = 0
+    # 运行报告格式，为空时不生成报告
+    _report_format = ""
+    # 保留的运行报告数
+    _report_keep = 10
+    # 单次文件系统操作超时（秒），为0时不限制
+    _op_timeout = 0
+    # 操作超时的目录首次隔离时长（分钟），连续超时时翻倍
+    _quarantine_minutes = 30
+    # 下次运行时进行性能分析，运行后自动关闭
+    _profile_next = False
+    # 保留的性能分析结果数
+    _profile_keep = 5
+    # 本次运行的性能分析
+    _profiler = None
+    # 文件系统操作看门狗
+    _watchdog = None
+    # 操作超时的目录隔离列表
+    _quarantine = None
+    # 排除目录匹配器
+    _exclude_matcher = None
+    # 清理目录的执行计划，配置变更前一直复用
+    _root_plan = None
+    # 目录监控
+    _watcher = None
+    # 事件触发的待检查目录队列
+    _event_debouncer = None
+    # 指定目录的清理任务队列
+    _job_queue = None
+    # 运行协调，定时、立即运行、实时清理与清理任务之间互斥，插件重新初始化时保持不变
+    _coordinator = RunCoordinator()
+    # 清理运行的实时进度
+    _progress = RunProgress()
+    # 触发方式名称
+    _TRIGGER_NAMES = {
+        "cron": "定时任务",
+        "onlyonce": "立即运行",
+        "follow_up": "合并触发后续运行",
+    }
     # 退出事件
-    _event = Event()
+    _event = ThreadEvent()
+    # 停止服务时等待进行中的运行退出的时长（秒）
+    _STOP_TIMEOUT = 30
 
     def init_plugin(self, config: dict = None):
         # 读取配置
@@ -60,25 +150,79 @@ class EmptyFolderCleaner(_PluginBase):
             self._recursive = config.get("recursive", True)
             self._exclude_dirs = config.get("exclude_dirs")
             self._dry_run = config.get("dry_run", False)
+            try:
+                self._max_workers = max(int(config.get("max_workers") or 1), 1)
+            except (TypeError, ValueError):
+                self._max_workers = 1
+            self._incremental = config.get("incremental", False)
+            try:
+                self._full_scan_interval = max(int(config.get("full_scan_interval") or 10), 1)
+            except (TypeError, ValueError):
+                self._full_scan_interval = 10
+            try:
+                self._max_runtime = max(int(config.get("max_runtime") or 0), 0)
+            except (TypeError, ValueError):
+                self._max_runtime = 0
+            self._watch_mode = config.get("watch_mode") or ""
+            try:
+                self._watch_debounce = max(int(config.get("watch_debounce") or 10), 1)
+            except (TypeError, ValueError):
+                self._watch_debounce = 10
+            try:
+                self._io_rate = max(float(config.get("io_rate") or 0), 0)
+            except (TypeError, ValueError):
+                self._io_rate = 0
+            try:
+                self._io_concurrency = max(int(config.get("io_concurrency") or 0), 0)
+            except (TypeError, ValueError):
+                self._io_concurrency = 0
+            self._io_adaptive = config.get("io_adaptive", False)
+            self._event_trigger = config.get("event_trigger", False)
+            self._one_filesystem = config.get("one_filesystem", False)
+            self._skip_fs_types = config.get("skip_fs_types")
+            try:
+                self._min_age = max(int(config.get("min_age") or 0), 0)
+            except (TypeError, ValueError):
+                self._min_age = 0
+            self._io_limits = config.get("io_limits")
+            self._report_format = config.get("report_format") or ""
+            try:
+                self._report_keep = max(int(config.get("report_keep") or 10), 1)
+            except (TypeError, ValueError):
+                self._report_keep = 10
+            try:
+                self._op_timeout = max(float(config.get("op_timeout") or 0), 0)
+            except (TypeError, ValueError):
+                self._op_timeout = 0
+            try:
+                self._quarantine_minutes = max(int(config.get("quarantine_minutes") or 30), 1)
+            except (TypeError, ValueError):
+                self._quarantine_minutes = 30
+            self._profile_next = config.get("profile_next", False)
+            try:
+                self._profile_keep = max(int(config.get("profile_keep") or 5), 1)
+            except (TypeError, ValueError):
+                self._profile_keep = 5
+
+        # 编译排除规则，运行期间不再重复解析
+        self._exclude_matcher = ExcludeMatcher.from_config(self._exclude_dirs)
+        # 配置可能已变化，清理目录在首次使用时重新规划
+        self._root_plan = None
 
         # 停止现有任务
         self.stop_service()
 
+        # 文件系统操作超时保护，超时的目录跨运行隔离
+        if self._op_timeout:
+            self._watchdog = Watchdog(self._op_timeout)
+            self._quarantine = Quarantine(self, self._quarantine_minutes * 60)
+
         # 启动定时任务 & 立即运行一次
         if self.get_state() or self._onlyonce:
             if not self.__validate_config():
                 self._enabled = False
                 self._onlyonce = False
-                self.update_config({
-                    "enabled": self._enabled,
-                    "onlyonce": self._onlyonce,
-                    "cron": self._cron,
-                    "notify": self._notify,
-                    "target_dirs": self._target_dirs,
-                    "recursive": self._recursive,
-                    "exclude_dirs": self._exclude_dirs,
-                    "dry_run": self._dry_run
-                })
+                self.__update_config()
                 return
 
             # 定时服务
@@ -86,36 +230,259 @@ class EmptyFolderCleaner(_PluginBase):
 
             if self._onlyonce:
                 logger.info(f"空文件夹清理服务启动，立即运行一次")
+                # 手动运行总是全量扫描，用于修正增量索引的偏差
                 self._scheduler.add_job(self.clean_empty_folders, 'date',
                                         run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(
-                                            seconds=3))
+                                            seconds=3),
+                                        kwargs={"full_scan": True, "trigger": "onlyonce"})
                 # 关闭一次性开关
                 self._onlyonce = False
-                self.update_config({
-                    "enabled": self._enabled,
-                    "onlyonce": self._onlyonce,
-                    "cron": self._cron,
-                    "notify": self._notify,
-                    "target_dirs": self._target_dirs,
-                    "recursive": self._recursive,
-                    "exclude_dirs": self._exclude_dirs,
-                    "dry_run": self._dry_run
-                })
+                self.__update_config()
 
             # 启动服务
             if self._scheduler.get_jobs():
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+        # 启动实时监控
+        if self._enabled and self._watch_mode and self._target_dirs:
+            self.__start_watcher()
+
+        # 事件触发的目录在防抖时间内合并后批量检查
+        if self._enabled and self._event_trigger and self._target_dirs:
+            self._event_debouncer = Debouncer(self._watch_debounce, self._watch_debounce * 6,
+                                              self.__on_dirs_changed)
+
+        # 通过接口或命令提交的指定目录清理任务，插件关闭时不接受
+        if self._enabled and self._target_dirs:
+            self._job_queue = JobQueue(runner=self.__run_job)
+
+    def __update_config(self):
+        """
+        保存当前配置
+        """
+        self.update_config({
+            "enabled": self._enabled,
+            "onlyonce": self._onlyonce,
+            "cron": self._cron,
+            "notify": self._notify,
+            "target_dirs": self._target_dirs,
+            "recursive": self._recursive,
+            "exclude_dirs": self._exclude_dirs,
+            "dry_run": self._dry_run,
+            "max_workers": self._max_workers,
+            "incremental": self._incremental,
+            "full_scan_interval": self._full_scan_interval,
+            "max_runtime": self._max_runtime,
+            "watch_mode": self._watch_mode,
+            "watch_debounce": self._watch_debounce,
+            "io_rate": self._io_rate,
+            "io_concurrency": self._io_concurrency,
+            "io_adaptive": self._io_adaptive,
+            "io_limits": self._io_limits,
+            "event_trigger": self._event_trigger,
+            "one_filesystem": self._one_filesystem,
+            "skip_fs_types": self._skip_fs_types,
+            "min_age": self._min_age,
+            "report_format": self._report_format,
+            "report_keep": self._report_keep,
+            "op_timeout": self._op_timeout,
+            "quarantine_minutes": self._quarantine_minutes,
+            "profile_next": self._profile_next,
+            "profile_keep": self._profile_keep
+        })
+
     def get_state(self):
         return True if self._enabled and self._cron and self._target_dirs else False
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
-        pass
+        """
+        定义远程控制命令
+        :return: 命令关键字、事件、描述、附带数据
+        """
+        return [
+            {
+                "cmd": "/empty_folder_clean",
+                "event": EventType.PluginAction,
+                "desc": "清理空文件夹",
+                "category": "",
+                "data": {
+                    "action": "empty_folder_clean"
+                }
+            }
+        ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/clean",
+                "endpoint": self.submit_job,
+                "methods": ["POST"],
+                "summary": "清理指定目录",
+                "description": "提交指定目录的清理任务，立即返回任务ID",
+            },
+            {
+                "path": "/job",
+                "endpoint": self.get_job,
+                "methods": ["GET"],
+                "summary": "清理任务状态",
+                "description": "查询清理任务的进度与结果",
+            },
+            {
+                "path": "/jobs",
+                "endpoint": self.list_jobs,
+                "methods": ["GET"],
+                "summary": "清理任务列表",
+                "description": "查询最近的清理任务",
+            },
+            {
+                "path": "/history",
+                "endpoint": self.get_history,
+                "methods": ["GET"],
+                "summary": "清理历史",
+                "description": "分页查询清理历史，按时间降序",
+            },
+            {
+                "path": "/removed",
+                "endpoint": self.get_removed_paths,
+                "methods": ["GET"],
+                "summary": "删除记录",
+                "description": "分页查询某次清理删除的文件夹路径",
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "summary": "清理性能指标",
+                "description": "获取最近几次清理的耗时、访问目录数等性能指标",
+            },
+            {
+                "path": "/progress",
+                "endpoint": self.get_progress,
+                "methods": ["GET"],
+                "summary": "清理进度",
+                "description": "查询正在进行或最近一次清理的进度",
+            },
+            {
+                "path": "/reports",
+                "endpoint": self.get_reports,
+                "methods": ["GET"],
+                "summary": "运行报告列表",
+                "description": "查询保留的运行报告文件",
+            },
+            {
+                "path": "/report",
+                "endpoint": self.get_report,
+                "methods": ["GET"],
+                "summary": "运行报告内容",
+                "description": "分页读取运行报告，可按判定结果与原因筛选",
+            },
+            {
+                "path": "/profiles",
+                "endpoint": self.get_profiles,
+                "methods": ["GET"],
+                "summary": "性能分析结果列表",
+                "description": "查询保留的性能分析结果，pstats 与折叠栈文件位于插件数据目录的 profiles 下",
+            }
+        ]
+
+    def submit_job(self, path: str, dry_run: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        API：提交指定目录的清理任务
+        :param path: 清理目录或其下的子目录
+        :param dry_run: 模拟运行，为空时使用插件配置
+        """
+        if not self._job_queue:
+            return {"success": False, "message": "插件未启用或未配置清理目录"}
+        root, message = self.__resolve_job_path(path)
+        if not root:
+            return {"success": False, "message": message}
+        job, message = self._job_queue.submit(os.path.normpath(path), root,
+                                              self._dry_run if dry_run is None else bool(dry_run))
+        if not job:
+            return {"success": False, "message": message}
+        return {"success": True, "message": message, "data": job.to_dict()}
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        API：查询清理任务状态
+        """
+        job = self._job_queue.get(job_id) if self._job_queue else None
+        if not job:
+            return {"success": False, "message": "任务不存在"}
+        return {"success": True, "data": job.to_dict()}
+
+    def list_jobs(self) -> Dict[str, Any]:
+        """
+        API：最近的清理任务，按提交时间降序
+        """
+        jobs = self._job_queue.list() if self._job_queue else []
+        return {"success": True, "data": [job.to_dict() for job in jobs]}
+
+    def get_history(self, page: int = 1, size: int = 20) -> Dict[str, Any]:
+        """
+        API：分页查询清理历史
+        """
+        items, total = HistoryStore(self).page(page, size)
+        return {"success": True, "data": {"items": items, "total": total, "page": page, "size": size}}
+
+    def get_removed_paths(self, seq: int, offset: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        API：分页查询某次清理删除的文件夹路径
+        :param seq: 清理历史中的记录序号
+        """
+        result = HistoryStore(self).removed_paths(seq, offset, limit)
+        if result is None:
+            return {"success": False, "message": "记录不存在或已被覆盖"}
+        paths, total = result
+        return {"success": True, "data": {"paths": paths, "total": total, "offset": offset}}
+
+    def get_metrics(self, limit: int = 10) -> Dict[str, Any]:
+        """
+        API：最近几次清理的性能指标，按时间降序
+        """
+        history, _ = HistoryStore(self).page(1, limit)
+        runs = [{
+            "clean_time": item.get("clean_time"),
+            "duration": item.get("duration"),
+            "removed_count": item.get("removed_count", 0),
+            "dry_run": item.get("dry_run", False),
+            "partial": item.get("partial", False),
+            **item.get("metrics", {})
+        } for item in history if item.get("metrics")]
+        return {"success": True, "data": runs}
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        API：清理进度，包括当前清理目录、已访问目录数、速度与按上次运行估计的剩余时间
+        """
+        return {"success": True, "data": self._progress.snapshot()}
+
+    def get_reports(self) -> Dict[str, Any]:
+        """
+        API：保留的运行报告，按时间降序
+        """
+        return {"success": True, "data": list_reports(self.get_data_path() / "reports")}
+
+    def get_profiles(self) -> Dict[str, Any]:
+        """
+        API：保留的性能分析结果，按时间降序
+        """
+        return {"success": True, "data": list_profiles(self.get_data_path() / "profiles")}
+
+    def get_report(self, name: str, offset: int = 0, limit: int = 100,
+                   decision: Optional[str] = None, reason: Optional[str] = None) -> Dict[str, Any]:
+        """
+        API：分页读取运行报告
+        :param name: 报告文件名
+        :param decision: 判定结果：removed、would_remove、kept、skipped
+        :param reason: 原因：empty、not_empty、excluded、mount、recent、protected、changed、gone、error
+        """
+        rows = read_report(self.get_data_path() / "reports", name, offset, limit, decision, reason)
+        if rows is None:
+            return {"success": False, "message": "报告不存在"}
+        return {"success": True, "data": {"rows": rows, "offset": offset}}
 
     def get_service(self) -> List[Dict[str, Any]]:
         """
@@ -128,7 +495,7 @@ class EmptyFolderCleaner(_PluginBase):
                     "name": "空文件夹清理服务",
                     "trigger": CronTrigger.from_crontab(self._cron),
                     "func": self.clean_empty_folders,
-                    "kwargs": {}
+                    "kwargs": {"trigger": "cron"}
                 }
             ]
         return []
@@ -148,7 +515,7 @@ class EmptyFolderCleaner(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -164,7 +531,7 @@ class EmptyFolderCleaner(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -180,7 +547,7 @@ class EmptyFolderCleaner(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -191,6 +558,24 @@ class EmptyFolderCleaner(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'event_trigger',
+                                            'label': '整理/删除后清理',
+                                            'hint': '整理完成或删除下载文件后检查源目录及其父目录',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -254,16 +639,55 @@ class EmptyFolderCleaner(_PluginBase):
                             {
                                 'component': 'VCol',
                                 'props': {
-                                    'cols': 12
+                                    'cols': 12,
+                                    'md': 4
                                 },
                                 'content': [
                                     {
-                                        'component': 'VTextarea',
+                                        'component': 'VTextField',
                                         'props': {
-                                            'model': 'target_dirs',
-                                            'label': '清理目录',
-                                            'rows': 3,
-                                            'placeholder': '每一行一个目录路径\n例如：\n/downloads\n/media/movies'
+                                            'model': 'max_workers',
+                                            'label': '并发线程数',
+                                            'type': 'number',
+                                            'placeholder': '1',
+                                            'hint': '大于1时多个清理目录及其一级子目录并发扫描，适合网络存储',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'incremental',
+                                            'label': '增量扫描',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'full_scan_interval',
+                                            'label': '全量扫描间隔',
+                                            'type': 'number',
+                                            'placeholder': '10',
+                                            'hint': '每隔N次增量扫描执行一次全量扫描，立即运行一次总是全量扫描',
+                                            'persistent-hint': True
                                         }
                                     }
                                 ]
@@ -276,108 +700,542 @@ class EmptyFolderCleaner(_PluginBase):
                             {
                                 'component': 'VCol',
                                 'props': {
-                                    'cols': 12
+                                    'cols': 12,
+                                    'md': 4
                                 },
                                 'content': [
                                     {
-                                        'component': 'VTextarea',
+                                        'component': 'VSelect',
                                         'props': {
-                                            'model': 'exclude_dirs',
-                                            'label': '排除目录',
-                                            'rows': 3,
-                                            'placeholder': '每一行一个目录路径，这些目录不会被删除\n例如：\n/downloads\n/media/movies'
+                                            'model': 'watch_mode',
+                                            'label': '实时监控',
+                                            'items': [
+                                                {'title': '关闭', 'value': ''},
+                                                {'title': '原生监控', 'value': 'native'},
+                                                {'title': '轮询监控（目录多时开销大）', 'value': 'polling'}
+                                            ],
+                                            'hint': '文件删除或移出后只检查受影响目录的父目录链，原生监控启动失败时关闭实时监控，定时任务可作为低频全量校验',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'watch_debounce',
+                                            'label': '防抖时间（秒）',
+                                            'type': 'number',
+                                            'placeholder': '10',
+                                            'hint': '监控或整理事件停止该时长后批量检查',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'max_runtime',
+                                            'label': '单次运行时长上限（分钟）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '超时后保存断点，下次运行从断点继续，0为不限制',
+                                            'persistent-hint': True
                                         }
                                     }
                                 ]
                             }
                         ]
-                    }
-                ]
-            }
-        ], {
-            "enabled": False,
-            "notify": False,
-            "onlyonce": False,
-            "cron": "0 2 * * *",
-            "target_dirs": "",
-            "recursive": True,
-            "exclude_dirs": "",
-            "dry_run": False
-        }
-
-    def get_page(self) -> List[dict]:
-        """
-        拼装插件详情页面，需要返回页面配置，同时附带数据
-        """
-        # 查询清理历史
-        history = self.get_data('history') or []
-        if not history:
-            return [
-                {
-                    'component': 'div',
-                    'text': '暂无清理历史',
-                    'props': {
-                        'class': 'text-center',
-                    }
-                }
-            ]
-        
-        # 数据按时间降序排序
-        history = sorted(history, key=lambda x: x.get('clean_time', ''), reverse=True)
-        
-        # 拼装页面
-        contents = []
-        for item in history[:20]:  # 只显示最近20条记录
-            clean_time = item.get("clean_time", "未知时间")
-            removed_count = item.get("removed_count", 0)
-            target_dirs = item.get("target_dirs", 0)
-            dry_run = item.get("dry_run", False)
-            
-            contents.append({
-                'component': 'VCard',
-                'props': {
-                    'class': 'mb-2'
-                },
-                'content': [
-                    {
-                        'component': 'VCardText',
-                        'props': {
-                            'class': 'pa-2'
-                        },
-                        'text': f'清理时间：{clean_time}'
-                    },
-                    {
-                        'component': 'VCardText',
-                        'props': {
-                            'class': 'pa-2'
-                        },
-                        'text': f'清理目录数：{target_dirs}'
                     },
                     {
-                        'component': 'VCardText',
-                        'props': {
-                            'class': 'pa-2'
-                        },
-                        'text': f'删除文件夹数：{removed_count}'
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'io_rate',
+                                            'label': '每秒列出目录数上限',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '每个清理目录单独计算，0为不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'io_concurrency',
+                                            'label': '同时进行的操作数上限',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '每个清理目录单独计算，0为不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'io_adaptive',
+                                            'label': '延迟升高时自动降速',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
                     },
                     {
-                        'component': 'VCardText',
-                        'props': {
-                            'class': 'pa-2'
-                        },
-                        'text': f'运行模式：{"模拟运行" if dry_run else "正常运行"}'
-                    }
-                ]
-            })
-
-        return [
-            {
-                'component': 'div',
-                'props': {
-                    'class': 'grid gap-3 grid-info-card',
-                },
-                'content': contents
-            }
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'one_filesystem',
+                                            'label': '不进入其它文件系统',
+                                            'hint': '跳过清理目录下的挂载点，如 rclone、NFS 或绑定挂载',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'skip_fs_types',
+                                            'label': '跳过的文件系统类型',
+                                            'placeholder': 'fuse.rclone,nfs,cifs',
+                                            'hint': '逗号分隔，这些类型的挂载点及位于其上的清理目录不会被扫描',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'min_age',
+                                            'label': '最短保留时间（分钟）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '修改时间在此之内的空文件夹暂不删除，避免删除刚创建待写入的目录',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'report_format',
+                                            'label': '运行报告',
+                                            'items': [
+                                                {'title': '关闭', 'value': ''},
+                                                {'title': 'JSONL', 'value': 'jsonl'},
+                                                {'title': 'CSV', 'value': 'csv'}
+                                            ],
+                                            'hint': '逐个记录每个目录的判定结果，开启后日志只保留汇总',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'report_keep',
+                                            'label': '保留报告数',
+                                            'type': 'number',
+                                            'placeholder': '10',
+                                            'hint': '超出后删除最旧的报告',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'op_timeout',
+                                            'label': '目录操作超时（秒）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '列出单个目录超过该时间时跳过并隔离，用于失效的 NFS/SMB 挂载，0为不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'quarantine_minutes',
+                                            'label': '隔离时长（分钟）',
+                                            'type': 'number',
+                                            'placeholder': '30',
+                                            'hint': '隔离期内不再访问该目录，连续超时时翻倍，最长24小时',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'profile_next',
+                                            'label': '下次运行时性能分析',
+                                            'hint': '记录下一次清理的耗时分布，运行后自动关闭，分析期间运行会变慢',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'profile_keep',
+                                            'label': '保留分析结果数',
+                                            'type': 'number',
+                                            'placeholder': '5',
+                                            'hint': '保存 pstats 与火焰图折叠栈文件，超出后删除最旧的',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'target_dirs',
+                                            'label': '清理目录',
+                                            'rows': 3,
+                                            'placeholder': '每一行一个目录路径，MoviePilot 存储中的目录写为 存储名:路径\n例如：\n/downloads\n/media/movies\nalist:/media/downloads'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'exclude_dirs',
+                                            'label': '排除目录',
+                                            'rows': 3,
+                                            'placeholder': '每一行一个排除规则，这些目录及其子目录不会被删除\n绝对路径：/media/movies\n目录名：@eaDir\n通配符：*.tmp、/media/*/extras'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'io_limits',
+                                            'label': '按目录限速',
+                                            'rows': 2,
+                                            'placeholder': '每一行一个清理目录，格式：路径|每秒列出数|操作数上限，留空的项使用上方设置\n例如：\n/mnt/nas|20|2'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ], {
+            "enabled": False,
+            "notify": False,
+            "onlyonce": False,
+            "cron": "0 2 * * *",
+            "target_dirs": "",
+            "recursive": True,
+            "exclude_dirs": "",
+            "dry_run": False,
+            "max_workers": 1,
+            "incremental": False,
+            "full_scan_interval": 10,
+            "max_runtime": 0,
+            "watch_mode": "",
+            "watch_debounce": 10,
+            "io_rate": 0,
+            "io_concurrency": 0,
+            "io_adaptive": False,
+            "io_limits": "",
+            "event_trigger": False,
+            "one_filesystem": False,
+            "skip_fs_types": "",
+            "min_age": 0,
+            "report_format": "",
+            "report_keep": 10,
+            "op_timeout": 0,
+            "quarantine_minutes": 30,
+            "profile_next": False,
+            "profile_keep": 5
+        }
+
+    def get_page(self) -> List[dict]:
+        """
+        拼装插件详情页面，需要返回页面配置，同时附带数据
+        """
+        # 查询清理历史与正在进行的清理
+        history, _ = HistoryStore(self).page(1, 20)
+        progress = self._progress.snapshot()
+        if not history and not progress.get("running"):
+            return [
+                {
+                    'component': 'div',
+                    'text': '暂无清理历史',
+                    'props': {
+                        'class': 'text-center',
+                    }
+                }
+            ]
+        
+        # 拼装页面，只读取最近20条记录
+        contents = []
+        if progress.get("running"):
+            visited = f'已访问目录数：{progress["dirs_visited"]}'
+            if progress["percent"] is not None:
+                visited += f' / 约 {progress["estimated_total"]}（{progress["percent"]}%）'
+            speed = f'速度：{progress["throughput"]} 个目录/秒，已运行 {progress["elapsed"]} 秒'
+            if progress["eta"] is not None:
+                speed += f'，预计剩余 {progress["eta"]} 秒'
+            texts = [
+                f'正在清理：{", ".join(progress["current_roots"]) or "准备中"}',
+                f'清理目录：{progress["roots_done"]} / {progress["roots_total"]}',
+                visited,
+                speed
+            ]
+            contents.append({
+                'component': 'VCard',
+                'props': {
+                    'class': 'mb-2'
+                },
+                'content': [
+                    {
+                        'component': 'VCardText',
+                        'props': {
+                            'class': 'pa-2'
+                        },
+                        'text': text
+                    } for text in texts
+                ]
+            })
+        for item in history:
+            clean_time = item.get("clean_time", "未知时间")
+            removed_count = item.get("removed_count", 0)
+            target_dirs = item.get("target_dirs", 0)
+            dry_run = item.get("dry_run", False)
+
+            texts = [
+                f'清理时间：{clean_time}',
+                f'清理目录数：{target_dirs}',
+                f'删除文件夹数：{removed_count}',
+                f'运行模式：{"模拟运行" if dry_run else "正常运行"}'
+            ]
+            if item.get("trigger"):
+                texts.append(f'触发方式：{self._TRIGGER_NAMES.get(item.get("trigger"), item.get("trigger"))}')
+            if item.get("coalesced"):
+                texts.append(f'合并触发：{len(item.get("coalesced"))} 次')
+            if item.get("dropped"):
+                texts.append(f'未执行触发：{len(item.get("dropped"))} 次（清理已停止）')
+            if item.get("partial"):
+                texts.append('运行状态：部分完成，下次从断点继续')
+            if item.get("skipped_count"):
+                texts.append(f'跳过删除数：{item.get("skipped_count")}（检查后写入了新内容）')
+            if item.get("quarantined"):
+                texts.append(f'隔离跳过：{", ".join(item.get("quarantined"))}')
+            if item.get("report"):
+                texts.append(f'运行报告：{item.get("report")}')
+            if item.get("profile"):
+                texts.append(f'性能分析：{item["profile"].get("name")}')
+                for func in item["profile"].get("top") or []:
+                    texts.append(f'　{func.get("function")}：自身 {func.get("self")} 秒，'
+                                 f'累计 {func.get("cumulative")} 秒，调用 {func.get("calls")} 次')
+            metrics = item.get("metrics")
+            if metrics:
+                totals = metrics.get("totals", {})
+                texts.append(f'耗时：{item.get("duration", 0)} 秒，访问目录数：{totals.get("dirs_visited", 0)}')
+                roots = metrics.get("roots", {})
+                if len(roots) > 1:
+                    slowest = max(roots, key=lambda x: roots[x].get("seconds", 0))
+                    texts.append(f'最慢目录：{slowest}（{roots[slowest].get("seconds", 0)} 秒）')
+                rss = metrics.get("rss_kb") or {}
+                if rss.get("peak_kb") is not None:
+                    texts.append(f'内存：开始 {(rss.get("start_kb") or 0) // 1024} MB，'
+                                 f'运行中最高 {rss.get("peak_kb") // 1024} MB，结束 {(rss.get("end_kb") or 0) // 1024} MB')
+
+            contents.append({
+                'component': 'VCard',
+                'props': {
+                    'class': 'mb-2'
+                },
+                'content': [
+                    {
+                        'component': 'VCardText',
+                        'props': {
+                            'class': 'pa-2'
+                        },
+                        'text': text
+                    } for text in texts
+                ]
+            })
+
+        return [
+            {
+                'component': 'div',
+                'props': {
+                    'class': 'grid gap-3 grid-info-card',
+                },
+                'content': contents
+            }
         ]
 
     def __validate_config(self) -> bool:
@@ -393,192 +1251,684 @@ class EmptyFolderCleaner(_PluginBase):
             )
             return False
         
-        # 检查目录是否存在
-        for target_dir in self._target_dirs.strip().split('\n'):
-            if not target_dir.strip():
-                continue
-            if not Path(target_dir.strip()).exists():
-                logger.error(f"清理目录不存在：{target_dir.strip()}")
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title="空文件夹清理",
-                    text=f"清理目录不存在：{target_dir.strip()}"
-                )
-                return False
+        # 检查目录是否存在，结果随执行计划缓存，存储模块中的目录在清理时检查
+        for target_dir in self.__root_plan().missing:
+            logger.error(f"清理目录不存在：{target_dir}")
+            self.post_message(
+                mtype=NotificationType.SiteMessage,
+                title="空文件夹清理",
+                text=f"清理目录不存在：{target_dir}"
+            )
+            return False
         return True
 
-    def __is_excluded(self, folder_path: Path) -> bool:
+    def __root_plan(self) -> RootPlan:
         """
-        检查文件夹是否在排除列表中
+        清理目录的执行计划，解析真实路径并去除重复与嵌套的目录，配置变更前只规划一次
         """
-        if not self._exclude_dirs:
-            return False
-        
-        folder_name = folder_path.name
-        exclude_list = [name.strip() for name in self._exclude_dirs.split('\n') if name.strip()]
-        
-        # 检查文件夹名是否在排除列表中
-        if folder_name in exclude_list:
-            return True
-        
-        # 检查完整路径是否匹配排除模式
-        folder_str = str(folder_path)
-        for exclude_pattern in exclude_list:
-            if exclude_pattern in folder_str:
-                return True
-        
-        return False
+        if self._root_plan is None:
+            self._root_plan = build_root_plan(self._target_dirs, self._io_limits, self._watchdog)
+            self._root_plan.log()
+        return self._root_plan
 
-    def __is_empty_folder(self, folder_path: Path) -> bool:
+    def __detect_mounts(self, roots: List[str]) -> Tuple[Set[str], Set[str], bool]:
         """
-        检查文件夹是否为空
+        读取一次挂载表，确定各清理目录下不进入的挂载点
+        返回: (不进入的挂载点, 位于跳过类型文件系统上的清理目录, 挂载表是否可用)
+        """
+        return find_boundaries(roots, self._one_filesystem, parse_fs_types(self._skip_fs_types))
+
+    def __build_scanner(self, index: Optional[DirectoryIndex] = None,
+                        deadline: Optional[float] = None,
+                        dry_run: Optional[bool] = None,
+                        mounts: Optional[Tuple[Set[str], Set[str], bool]] = None,
+                        report: Optional[ReportWriter] = None) -> EmptyFolderScanner:
+        """
+        按当前配置构建扫描引擎
+        """
+        boundaries, _, has_mount_table = mounts or (set(), set(), True)
+        return EmptyFolderScanner(
+            recursive=self._recursive,
+            dry_run=self._dry_run if dry_run is None else dry_run,
+            is_excluded=self._exclude_matcher.match if self._exclude_matcher else None,
+            stop_event=self._event,
+            index=index,
+            deadline=deadline,
+            boundaries=boundaries,
+            # 无法读取挂载表时退回逐个比较设备号，Windows 的目录项不提供设备号
+            check_device=self._one_filesystem and not has_mount_table and os.name == "posix",
+            min_age=self._min_age * 60,
+            protected=self.__root_plan().protected,
+            watchdog=self._watchdog,
+            quarantine=self._quarantine,
+            report=report,
+            # 插件自身删除的目录不再触发实时清理
+            on_remove=self._watcher.ignore if self._watcher else None
+        )
+
+    def __open_report(self) -> Optional[ReportWriter]:
         """
+        按配置创建本次运行的报告，未开启或创建失败时返回None
+        """
+        if not self._report_format:
+            return None
         try:
-            # 检查文件夹是否存在
-            if not folder_path.exists() or not folder_path.is_dir():
-                return False
-            
-            # 获取文件夹内容
-            items = list(folder_path.iterdir())
-            
-            # 如果没有任何内容，则为空文件夹
-            if not items:
-                return True
-            
-            # 如果开启递归模式，检查是否只包含空文件夹
-            if self._recursive:
-                for item in items:
-                    if item.is_file():
-                        return False
-                    elif item.is_dir() and not self.__is_empty_folder(item):
-                        return False
-                return True
-            
-            return False
-        except (OSError, PermissionError) as e:
-            logger.warning(f"检查文件夹 {folder_path} 时出错：{str(e)}")
-            return False
+            return ReportWriter(self.get_data_path() / "reports", self._report_format, self._report_keep)
+        except OSError as e:
+            logger.error(f"创建运行报告失败：{str(e)}")
+            return None
+
+    def __build_throttles(self, roots: List[str]) -> Dict[str, IoThrottle]:
+        """
+        为每个清理目录构建 I/O 限速，未限速的目录不包含在结果中
+        """
+        limits = self.__root_plan().limits
+        throttles = {}
+        for root in roots:
+            rate, concurrency = limits.get(root, (-1, -1))
+            throttle = IoThrottle(rate=self._io_rate if rate < 0 else rate,
+                                  concurrency=self._io_concurrency if concurrency < 0 else concurrency,
+                                  adaptive=self._io_adaptive,
+                                  stop_event=self._event)
+            if throttle.enabled:
+                throttles[root] = throttle
+        return throttles
+
+    def __open_index(self, full_scan: bool, boundaries: Set[str]) -> Optional[DirectoryIndex]:
+        """
+        打开增量扫描索引，排除规则或挂载点变化时索引自动重建
+        """
+        fingerprint = hashlib.md5("\n".join([(self._exclude_dirs or "").strip(), str(bool(self._one_filesystem)),
+                                             *sorted(boundaries)]).encode("utf-8")).hexdigest()
+        try:
+            index = DirectoryIndex(self.get_data_path() / "dir_index.db", fingerprint)
+        except Exception as e:
+            logger.error(f"打开目录索引失败，本次执行全量扫描：{str(e)}")
+            return None
+        if index.begin_run(self._full_scan_interval, force_full=full_scan):
+            logger.info("本次执行全量扫描")
+        else:
+            logger.info("本次执行增量扫描")
+        return index
+
+    def __estimate_dirs(self) -> int:
+        """
+        按最近一次完整运行的访问目录数估计本次运行的目录总数
+        """
+        history, _ = HistoryStore(self).page(1, 5)
+        for item in history:
+            if item.get("metrics") and not item.get("partial"):
+                return item["metrics"].get("totals", {}).get("dirs_visited", 0)
+        return 0
+
+    def __clean_storage(self, storage: str, path: str,
+                        removed_log: Optional[RemovedPathLog] = None,
+                        report: Optional[ReportWriter] = None) -> ScanStats:
+        """
+        通过存储模块清理目录，按层批量列出与删除
+        返回: 性能统计，含删除数量
+        """
+        stats = ScanStats()
+        logger.info(f"清理目录：{storage}:{path}")
+        self._progress.track(stats)
+        try:
+            backend = open_storage(storage)
+        except Exception as e:
+            logger.error(f"打开存储 {storage} 失败：{str(e)}")
+            stats.errors += 1
+            return stats
+        self._progress.enter(f"{storage}:{path}")
+        try:
+            scanner = StorageScanner(
+                backend,
+                recursive=self._recursive,
+                dry_run=self._dry_run,
+                is_excluded=self._exclude_matcher.match if self._exclude_matcher else None,
+                stop_event=self._event,
+                protected=self.__root_plan().storage_protected.get(storage),
+                report=report
+            )
+            self.__drain(scanner.iter_scan(path, stats), removed_log)
+        except Exception as e:
+            logger.error(f"清理过程中出错：{str(e)}")
+        finally:
+            backend.close()
+            self._progress.leave(f"{storage}:{path}")
+        if not self._event.is_set():
+            self._progress.finish_root(f"{storage}:{path}")
+        return stats
+
+    @staticmethod
+    def __drain(removed_folders: Iterator[str], removed_log: Optional[RemovedPathLog] = None):
+        """
+        执行遍历，记录删除的路径
+        """
+        for path in removed_folders:
+            if removed_log:
+                removed_log.add(path)
+
+    def __drain_task(self, root: str, removed_folders: Iterator[str],
+                     removed_log: Optional[RemovedPathLog] = None):
+        """
+        并发任务，运行期间计入清理目录的进度
+        """
+        self._progress.enter(root)
+        profiler = self._profiler
+        if profiler:
+            profiler.attach()
+        try:
+            self.__drain(removed_folders, removed_log)
+        finally:
+            if profiler:
+                profiler.detach()
+            self._progress.leave(root)
 
-    def __remove_empty_folders(self, root_path: Path) -> Tuple[int, List[str]]:
+    def __remove_empty_folders(self, root_path: Path, scanner: EmptyFolderScanner,
+                               cursor: Optional[WalkCursor] = None,
+                               throttle: Optional[IoThrottle] = None,
+                               removed_log: Optional[RemovedPathLog] = None) -> ScanStats:
         """
         递归删除空文件夹
-        返回: (删除数量, 删除的文件夹列表)
+        返回: 性能统计，含删除数量
         """
-        removed_count = 0
-        removed_folders = []
-        
+        stats = ScanStats()
+        self._progress.track(stats)
+
         try:
-            # 如果根路径不存在，直接返回
-            if not root_path.exists():
-                return removed_count, removed_folders
-            
-            # 遍历所有子目录，从最深层开始
-            all_dirs = []
-            for dirpath, dirnames, filenames in os.walk(root_path, topdown=False):
-                dir_path = Path(dirpath)
-                if dir_path != root_path:  # 不删除根目录本身
-                    all_dirs.append(dir_path)
-            
-            # 按深度排序，先处理最深的目录
-            all_dirs.sort(key=lambda x: len(x.parts), reverse=True)
-            
-            for dir_path in all_dirs:
-                if self._event.is_set():
-                    logger.info("空文件夹清理服务停止")
-                    break
-                
-                # 检查是否在排除列表中
-                if self.__is_excluded(dir_path):
-                    logger.debug(f"跳过排除目录：{dir_path}")
-                    continue
-                
-                # 检查是否为空文件夹
-                if self.__is_empty_folder(dir_path):
-                    try:
-                        if self._dry_run:
-                            logger.info(f"[模拟] 将删除空文件夹：{dir_path}")
-                            removed_folders.append(str(dir_path))
-                            removed_count += 1
-                        else:
-                            logger.info(f"删除空文件夹：{dir_path}")
-                            shutil.rmtree(dir_path)
-                            removed_folders.append(str(dir_path))
-                            removed_count += 1
-                    except (OSError, PermissionError) as e:
-                        logger.error(f"删除文件夹 {dir_path} 失败：{str(e)}")
-        
+            # 如果根路径不存在，直接返回；根目录本身失效时由列出时的超时处理
+            if not self._watchdog and not root_path.exists():
+                return stats
+
+            # 单次自底向上遍历，每个目录只列出一次，边遍历边删除
+            self.__drain(scanner.iter_scan(str(root_path), cursor, stats, throttle), removed_log)
+
         except Exception as e:
             logger.error(f"清理过程中出错：{str(e)}")
-        
-        return removed_count, removed_folders
 
-    def clean_empty_folders(self):
+        return stats
+
+    def __load_checkpoint(self, target_paths: List[Path]) -> Optional[Dict[str, str]]:
+        """
+        读取上次中断时保存的断点，清理目录已变化时忽略
+        """
+        checkpoint = self.get_data("checkpoint")
+        if not checkpoint:
+            return None
+        if checkpoint.get("root") not in [str(target_path) for target_path in target_paths]:
+            logger.info("清理目录已变化，忽略上次保存的断点")
+            return None
+        logger.info(f"从上次中断处继续清理：{checkpoint.get('path') or checkpoint.get('root')}")
+        return checkpoint
+
+    @staticmethod
+    def __pending_roots(target_paths: List[Path], checkpoint: Optional[Dict[str, str]]) -> List[Path]:
+        """
+        跳过断点之前已完成的清理目录
+        """
+        if not checkpoint:
+            return target_paths
+        roots = [str(target_path) for target_path in target_paths]
+        return target_paths[roots.index(checkpoint.get("root")):]
+
+    def __clean_sequential(self, target_paths: List[Path], scanner: EmptyFolderScanner,
+                           checkpoint: Optional[Dict[str, str]] = None,
+                           throttles: Optional[Dict[str, IoThrottle]] = None,
+                           removed_log: Optional[RemovedPathLog] = None
+                           ) -> Tuple[Dict[Path, ScanStats], Optional[Dict[str, str]]]:
+        """
+        逐个清理目标目录
+        返回: (各目录性能统计, 中断时的断点)
+        """
+        results = {}
+        for target_path in self.__pending_roots(target_paths, checkpoint):
+            if scanner.should_stop():
+                return results, {"root": str(target_path), "path": None}
+            logger.info(f"清理目录：{target_path}")
+            resume_from = checkpoint.get("path") if checkpoint and checkpoint.get("root") == str(target_path) else None
+            cursor = WalkCursor(resume_from)
+            self._progress.enter(str(target_path))
+            try:
+                results[target_path] = self.__remove_empty_folders(target_path, scanner, cursor,
+                                                                   (throttles or {}).get(str(target_path)),
+                                                                   removed_log)
+            finally:
+                self._progress.leave(str(target_path))
+            if cursor.stopped_at:
+                return results, {"root": str(target_path), "path": cursor.stopped_at}
+            self._progress.finish_root(str(target_path))
+        return results, None
+
+    def __clean_parallel(self, target_paths: List[Path], scanner: EmptyFolderScanner,
+                         checkpoint: Optional[Dict[str, str]] = None,
+                         throttles: Optional[Dict[str, IoThrottle]] = None,
+                         removed_log: Optional[RemovedPathLog] = None
+                         ) -> Tuple[Dict[Path, ScanStats], Optional[Dict[str, str]]]:
+        """
+        并发清理，各目标目录的一级子目录作为独立任务提交到有界线程池
+        根目录本身不会被删除，因此各一级子目录之间互不依赖
+        每个任务独立统计，完成后在主线程合并，耗时为各任务累计值
+        返回: (各目录性能统计, 中断时的断点)
+        """
+        pending_roots = self.__pending_roots(target_paths, checkpoint)
+        results = {target_path: ScanStats() for target_path in pending_roots}
+        # 各清理目录本身的列出统计，与任务统计一样在结束后合并
+        root_stats = {target_path: ScanStats() for target_path in pending_roots}
+        # 按遍历顺序排列的任务: (清理目录, 一级子目录, 断点, 统计, 任务)
+        tasks = []
+        with ThreadPoolExecutor(max_workers=self._max_workers,
+                                thread_name_prefix="EmptyFolderCleaner") as executor:
+            for target_path in pending_roots:
+                logger.info(f"清理目录：{target_path}")
+                # 同一清理目录的任务共用限速
+                throttle = (throttles or {}).get(str(target_path))
+                resume_from = checkpoint.get("path") \
+                    if checkpoint and checkpoint.get("root") == str(target_path) else None
+                # 断点所在的一级子目录
+                resume_task = None
+                if resume_from:
+                    prefix = os.path.join(str(target_path), "")
+                    resume_task = prefix + resume_from[len(prefix):].split(os.sep, 1)[0]
+                self._progress.track(root_stats[target_path])
+                for subdir in scanner.list_subdirs(str(target_path), throttle, root_stats[target_path]):
+                    # 跳过断点之前已完成的一级子目录
+                    if resume_task and subdir < resume_task:
+                        continue
+                    cursor = WalkCursor(resume_from)
+                    stats = ScanStats()
+                    self._progress.track(stats)
+                    tasks.append((target_path, subdir, cursor, stats,
+                                  executor.submit(self.__drain_task, str(target_path),
+                                                  scanner.iter_subtree(subdir, cursor, stats, throttle),
+                                                  removed_log)))
+
+            # 各清理目录未完成的任务数，全部完成时计入已完成的清理目录
+            remaining = {target_path: 0 for target_path in pending_roots}
+            for task in tasks:
+                remaining[task[0]] += 1
+            for target_path, count in remaining.items():
+                if not count:
+                    self._progress.finish_root(str(target_path))
+            roots_of = {task[4]: task[0] for task in tasks}
+
+            for future in as_completed([task[4] for task in tasks]):
+                if self._event.is_set():
+                    # 取消尚未开始的任务，运行中的任务会在下一个目录前退出
+                    for task in tasks:
+                        task[4].cancel()
+                    break
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"清理过程中出错：{str(e)}")
+                remaining[roots_of[future]] -= 1
+                if not remaining[roots_of[future]]:
+                    self._progress.finish_root(str(roots_of[future]))
+
+        # 线程池退出时运行中的任务均已结束，在主线程合并统计
+        for target_path, stats in root_stats.items():
+            results[target_path].merge(stats)
+        for target_path, _, _, stats, _ in tasks:
+            results[target_path].merge(stats)
+
+        # 断点取遍历顺序上第一个未完成的位置，之后已完成的任务下次会重新检查
+        for target_path, subdir, cursor, _, future in tasks:
+            if future.cancelled():
+                return results, {"root": str(target_path), "path": subdir}
+            if cursor.stopped_at:
+                return results, {"root": str(target_path), "path": cursor.stopped_at}
+        return results, None
+
+    def __resolve_job_path(self, path: Optional[str]) -> Tuple[Optional[str], str]:
+        """
+        校验清理任务的目录，只允许清理目录及其子目录
+        返回: (所属的清理目录, 错误说明)
+        """
+        if not path or not os.path.isabs(path):
+            return None, "请指定绝对路径"
+        path = os.path.normpath(path)
+        if self._quarantine and self._quarantine.covers(path):
+            return None, f"目录访问超时，已隔离：{path}"
+        try:
+            is_dir = self._watchdog.run(os.path.isdir, path, path=path) if self._watchdog else os.path.isdir(path)
+        except TimeoutError:
+            self._quarantine.add(path)
+            return None, f"目录访问超时，已隔离：{path}"
+        if not is_dir:
+            return None, f"目录不存在：{path}"
+        # 取最长匹配的根目录
+        root = max((r for r in self.__target_roots()
+                    if path == r or path.startswith(r.rstrip(os.sep) + os.sep)), key=len, default=None)
+        if not root:
+            return None, f"目录不在清理目录中：{path}"
+        mounts = self.__detect_mounts([root])
+        if root in mounts[1]:
+            return None, f"清理目录位于跳过的文件系统上：{root}"
+        if self.__build_scanner(mounts=mounts).is_excluded_path(path, root):
+            return None, f"目录已被排除：{path}"
+        return root, ""
+
+    def __run_job(self, job: CleanJob):
+        """
+        执行清理任务，子目录本身为空时同样删除，并继续检查其父目录链
+        """
+        # 等待同一目录上的其它清理结束
+        if not self._coordinator.acquire([job.path], self._event):
+            return
+        try:
+            logger.info(f"开始清理任务 {job.job_id}：{job.path}")
+            scanner = self.__build_scanner(dry_run=job.dry_run, mounts=self.__detect_mounts([job.root]))
+            throttle = self.__build_throttles([job.root]).get(job.root)
+            if job.path == job.root:
+                for _ in scanner.iter_scan(job.path, stats=job.stats, throttle=throttle):
+                    pass
+            else:
+                removed_folders = set(scanner.iter_subtree(job.path, stats=job.stats, throttle=throttle))
+                # 模拟运行时目录不会真正消失，父目录链无需再检查
+                if job.path in removed_folders and not job.dry_run:
+                    scanner.clean_ancestors(os.path.dirname(job.path), job.root, set(),
+                                            stats=job.stats, throttle=throttle)
+        finally:
+            self._coordinator.release([job.path])
+            if self._quarantine is not None:
+                self._quarantine.save()
+        logger.info(f"清理任务 {job.job_id} 完成：{job.path}，删除 {job.stats.removed} 个空文件夹")
+
+    @eventmanager.register(EventType.PluginAction)
+    def remote_clean(self, event: Event):
+        """
+        远程命令清理，带参数时只清理指定目录，否则清理全部清理目录
+        """
+        if not event or not event.event_data:
+            return
+        event_data = event.event_data
+        if event_data.get("action") != "empty_folder_clean":
+            return
+        arg = (event_data.get("arg_str") or "").strip()
+        texts = []
+        for path in [arg] if arg else self.__target_roots():
+            result = self.submit_job(path)
+            if result.get("success"):
+                texts.append(f"{path}：任务 {result['data']['job_id']}，{result.get('message')}")
+            else:
+                texts.append(f"{path}：{result.get('message')}")
+        self.post_message(
+            channel=event_data.get("channel"),
+            userid=event_data.get("user"),
+            mtype=NotificationType.Plugin,
+            title="【空文件夹清理】",
+            text="\n".join(texts) or "未配置清理目录"
+        )
+
+    def __target_roots(self) -> List[str]:
+        """
+        获取需要遍历的本地清理根目录，已去除重复与嵌套的目录
+        """
+        return self.__root_plan().local_roots
+
+    def __start_watcher(self):
+        """
+        启动目录监控
+        """
+        roots = self.__target_roots()
+        if not roots:
+            logger.warning("没有可监控的清理目录")
+            return
+        self._watcher = FolderWatcher(roots=roots,
+                                      callback=self.__on_dirs_changed,
+                                      mode=self._watch_mode,
+                                      debounce=self._watch_debounce)
+        if not self._watcher.start():
+            self._watcher = None
+
+    def __queue_dir(self, path: Optional[str]):
+        """
+        将受影响的目录加入待检查队列，清理目录之外的路径在检查时忽略
+        """
+        if not path or not self._event_debouncer:
+            return
+        self._event_debouncer.add(os.path.normpath(path))
+
+    @eventmanager.register(EventType.TransferComplete)
+    def on_transfer_complete(self, event: Event):
+        """
+        整理完成后检查源目录
+        """
+        if not self._event_debouncer or not event or not event.event_data:
+            return
+        fileitem = event.event_data.get("fileitem")
+        if not fileitem:
+            return
+        if isinstance(fileitem, dict):
+            storage, item_type, path = fileitem.get("storage"), fileitem.get("type"), fileitem.get("path")
+        else:
+            storage, item_type, path = fileitem.storage, fileitem.type, fileitem.path
+        # 只处理本地存储
+        if not path or (storage and storage != "local"):
+            return
+        path = os.path.normpath(path)
+        # 整理的是目录时检查目录本身，是文件时检查所在目录
+        self.__queue_dir(path if item_type == "dir" else os.path.dirname(path))
+
+    @eventmanager.register(EventType.DownloadFileDeleted)
+    def on_download_file_deleted(self, event: Event):
+        """
+        删除下载文件后检查所在目录
+        """
+        if not self._event_debouncer or not event or not event.event_data:
+            return
+        src = event.event_data.get("src")
+        if src:
+            self.__queue_dir(os.path.dirname(os.path.normpath(str(src))))
+
+    def __on_dirs_changed(self, changed_dirs: Set[str]):
+        """
+        监控与事件回调，只检查受影响目录的父目录链
+        清理目录正在遍历时不等待，受影响的目录合并后在遍历结束时统一检查
+        """
+        roots = self.__target_roots()
+        grouped: Dict[str, Set[str]] = {}
+        for changed_dir in changed_dirs:
+            # 取最长匹配的根目录
+            root = max((r for r in roots if changed_dir.startswith(r.rstrip(os.sep) + os.sep)),
+                       key=len, default=None)
+            if root:
+                grouped.setdefault(root, set()).add(changed_dir)
+        if grouped:
+            self._coordinator.check_dirs(grouped, self.__clean_changed_dirs)
+
+    def __clean_changed_dirs(self, grouped: Dict[str, Set[str]]):
+        """
+        检查受影响目录的父目录链，执行期间已占用这些清理目录
+        :param grouped: 按清理目录分组的受影响目录
+        """
+        mounts = self.__detect_mounts(list(grouped))
+        roots = [root for root in grouped if root not in mounts[1]]
+        scanner = self.__build_scanner(mounts=mounts)
+        throttles = self.__build_throttles(roots)
+        visited = set()
+        total_removed = 0
+        changed_count = 0
+        try:
+            for root in roots:
+                changed_count += len(grouped[root])
+                # 先处理最深的目录，父目录链在浅层汇合时不再重复检查
+                for changed_dir in sorted(grouped[root], key=lambda x: x.count(os.sep), reverse=True):
+                    if scanner.should_stop():
+                        return
+                    total_removed += scanner.clean_ancestors(changed_dir, root, visited,
+                                                             throttle=throttles.get(root))
+        finally:
+            if self._quarantine is not None:
+                self._quarantine.save()
+        if total_removed:
+            logger.info(f"实时清理完成，检查 {changed_count} 个目录，删除 {total_removed} 个空文件夹")
+
+    def clean_empty_folders(self, full_scan: bool = False, trigger: str = "cron"):
+        """
+        开始清理空文件夹，已有清理正在运行时合并到其结束后的一次运行
+        :param full_scan: 增量模式下强制全量扫描
+        :param trigger: 触发方式
+        """
+        self._coordinator.run("clean", self.__target_roots, self.__clean_triggered,
+                              stop_event=self._event, full_scan=full_scan, trigger=trigger)
+
+    def __clean_triggered(self, triggers: List[Dict[str, Any]], follow_up: bool):
+        """
+        执行一次清理，合并的多次触发中任一要求全量扫描时执行全量扫描
+        """
+        self.__clean(full_scan=any(t.get("full_scan") for t in triggers),
+                     trigger="follow_up" if follow_up else triggers[0].get("trigger"),
+                     coalesced=[t.get("trigger") for t in triggers] if follow_up else [])
+
+    def __clean(self, full_scan: bool, trigger: str, coalesced: List[str]):
         """
-        开始清理空文件夹
+        清理空文件夹
+        :param trigger: 触发方式
+        :param coalesced: 合并到本次运行的触发
         """
         logger.info("开始清理空文件夹 ...")
-        
+        if coalesced:
+            logger.info(f"本次运行合并了 {len(coalesced)} 次触发")
+
         if not self.__validate_config():
             return
-        
-        total_removed = 0
-        all_removed_folders = []
-        
-        # 处理每个目标目录
-        target_directories = [dir_path.strip() for dir_path in self._target_dirs.split('\n') if dir_path.strip()]
-        
-        for target_dir in target_directories:
+
+        start_time = time.monotonic()
+
+        # 按执行计划处理每个目标目录，每个目录只遍历一次
+        plan = self.__root_plan()
+        target_paths = [Path(root) for root in plan.local_roots]
+        storage_roots = plan.storage_roots
+
+        # 挂载点每次运行检测一次，位于跳过类型文件系统上的清理目录整体跳过
+        mounts = self.__detect_mounts([str(target_path) for target_path in target_paths])
+        for skipped_root in mounts[1]:
+            logger.warning(f"清理目录位于跳过的文件系统上，跳过：{skipped_root}")
+        target_paths = [target_path for target_path in target_paths if str(target_path) not in mounts[1]]
+        self._progress.start([str(target_path) for target_path in target_paths]
+                             + [f"{storage}:{path}" for storage, path in storage_roots],
+                             trigger, self.__estimate_dirs())
+
+        # 清理目标目录
+        index = self.__open_index(full_scan, mounts[0]) if self._incremental else None
+        deadline = time.monotonic() + self._max_runtime * 60 if self._max_runtime else None
+        report = self.__open_report()
+        scanner = self.__build_scanner(index, deadline, mounts=mounts, report=report)
+        checkpoint = self.__load_checkpoint(target_paths)
+        throttles = self.__build_throttles([str(target_path) for target_path in target_paths])
+        removed_log = RemovedPathLog()
+        # 性能分析只针对一次运行，开始后关闭开关
+        if self._profile_next:
+            self._profile_next = False
+            self.__update_config()
+            self._profiler = RunProfiler(self.get_data_path() / "profiles", self._profile_keep)
+            self._profiler.start()
+            logger.info("本次运行进行性能分析")
+        profiler = self._profiler
+        profile_top = None
+        rss_sampler = RssSampler()
+        rss_sampler.start()
+        try:
+            if self._max_workers > 1:
+                results, checkpoint = self.__clean_parallel(target_paths, scanner, checkpoint, throttles,
+                                                            removed_log)
+            else:
+                results, checkpoint = self.__clean_sequential(target_paths, scanner, checkpoint, throttles,
+                                                              removed_log)
+            for storage, storage_path in storage_roots:
+                if scanner.should_stop():
+                    logger.info(f"运行已中断，跳过存储目录：{storage}:{storage_path}")
+                    continue
+                results[f"{storage}:{storage_path}"] = self.__clean_storage(storage, storage_path,
+                                                                            removed_log, report)
+        finally:
+            if index:
+                index.close()
+            if report:
+                report.close()
+                logger.info(f"运行报告已保存：{report.name}，共 {report.lines} 条记录")
+            self._progress.finish()
+            rss = rss_sampler.stop()
+            if self._quarantine is not None:
+                self._quarantine.save()
+            if profiler:
+                self._profiler = None
+                try:
+                    profile_top = profiler.stop()
+                    logger.info(f"性能分析结果已保存：{profiler.name}")
+                except Exception as e:
+                    logger.error(f"保存性能分析结果失败：{str(e)}")
+
+        # 保存断点，下次从中断处继续
+        if checkpoint:
+            self.save_data("checkpoint", checkpoint)
             if self._event.is_set():
-                logger.info("空文件夹清理服务停止")
-                break
-            
-            target_path = Path(target_dir)
-            logger.info(f"清理目录：{target_path}")
-            
-            if not target_path.exists():
-                logger.warning(f"目录不存在，跳过：{target_path}")
-                continue
-            
-            if not target_path.is_dir():
-                logger.warning(f"路径不是目录，跳过：{target_path}")
-                continue
-            
-            # 清理当前目录
-            removed_count, removed_folders = self.__remove_empty_folders(target_path)
-            total_removed += removed_count
-            all_removed_folders.extend(removed_folders)
-            
-            logger.info(f"目录 {target_path} 清理完成，删除了 {removed_count} 个空文件夹")
-        
+                logger.info("空文件夹清理服务停止，已保存断点")
+            else:
+                logger.info(f"已达到单次运行时长上限，下次从断点继续：{checkpoint.get('path') or checkpoint.get('root')}")
+        else:
+            self.del_data("checkpoint")
+
+        totals = ScanStats()
+        for target_path, stats in results.items():
+            totals.merge(stats)
+            logger.info(f"目录 {target_path} 清理完成，删除了 {stats.removed} 个空文件夹，"
+                        f"访问 {stats.dirs_visited} 个目录，耗时 {stats.total_seconds:.2f} 秒")
+        total_removed = totals.removed
+        duration = round(time.monotonic() - start_time, 3)
+
         # 记录清理结果
         if total_removed > 0:
             logger.info(f"空文件夹清理完成，共删除 {total_removed} 个空文件夹")
-            if logger.level <= 10:  # DEBUG级别
-                for folder in all_removed_folders:
-                    logger.debug(f"已删除：{folder}")
         else:
             logger.info("没有发现需要清理的空文件夹")
-        
-        # 保存清理历史
-        history = self.get_data('history') or []
-        history.append({
+        if totals.skipped:
+            logger.info(f"{totals.skipped} 个文件夹在检查后写入了新内容，已跳过删除")
+        if totals.recent:
+            logger.info(f"{totals.recent} 个空文件夹修改时间在 {self._min_age} 分钟之内，暂不删除")
+
+        # 处于隔离期、本次跳过的目录
+        quarantined = [entry["path"] for entry in self._quarantine.active()] if self._quarantine is not None else []
+        if quarantined:
+            logger.warning(f"{len(quarantined)} 个目录处于隔离期，已跳过：{', '.join(quarantined)}")
+
+        # 运行被停止时，等待合并执行的触发不再执行，记录到本次运行
+        dropped = [t.get("trigger") for t in self._coordinator.take_pending("clean")] if self._event.is_set() else []
+        if dropped:
+            logger.info(f"清理已停止，{len(dropped)} 次合并的触发未执行")
+
+        # 保存清理历史，删除的路径压缩后单独保存
+        HistoryStore(self).append({
             "clean_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "removed_count": total_removed,
-            "target_dirs": len(target_directories),
-            "dry_run": self._dry_run
-        })
-        # 只保留最近50条记录
-        if len(history) > 50:
-            history = history[-50:]
-        self.save_data("history", history)
+            "skipped_count": totals.skipped,
+            "partial": bool(checkpoint),
+            "target_dirs": plan.root_count,
+            "dry_run": self._dry_run,
+            "trigger": trigger,
+            "coalesced": coalesced,
+            "dropped": dropped,
+            "duration": duration,
+            "report": report.name if report else None,
+            "quarantined": quarantined,
+            "profile": {"name": profiler.name, "top": profile_top} if profile_top is not None else None,
+            "metrics": {
+                "roots": {str(target_path): stats.to_dict() for target_path, stats in results.items()},
+                "totals": totals.to_dict(),
+                # 本次运行的常驻内存（KB）：开始、结束与运行期间的最大值
+                "rss_kb": rss
+            }
+        }, removed_log)
         
         # 发送通知
         if self._notify:
             mode_text = "[模拟运行] " if self._dry_run else ""
+            if checkpoint:
+                mode_text += "[部分完成] "
             self.post_message(
                 mtype=NotificationType.SiteMessage,
                 title="【空文件夹清理任务执行完成】",
-                text=f"{mode_text}清理目录：{len(target_directories)} 个，删除空文件夹：{total_removed} 个"
+                text=f"{mode_text}清理目录：{plan.root_count} 个，删除空文件夹：{total_removed} 个"
             )
         
         logger.info("空文件夹清理任务执行完成")
@@ -587,13 +1937,35 @@ class EmptyFolderCleaner(_PluginBase):
         """
         退出插件
         """
+        # 定时服务启动的运行不在插件的调度器中，总是通知所有运行退出
+        self._event.set()
         try:
+            if self._watcher:
+                self._watcher.stop()
+                self._watcher = None
+            if self._event_debouncer:
+                self._event_debouncer.cancel()
+                self._event_debouncer = None
+            self._coordinator.cancel_deferred()
+            if self._job_queue:
+                self._job_queue.stop()
+                self._job_queue = None
             if self._scheduler:
                 self._scheduler.remove_all_jobs()
                 if self._scheduler.running:
-                    self._event.set()
                     self._scheduler.shutdown()
-                    self._event.clear()
                 self._scheduler = None
         except Exception as e:
             logger.error(f"停止服务时出错：{str(e)}")
+        finally:
+            # 运行退出并保存断点后才能清除退出事件，否则运行会继续到结束
+            if self._coordinator.wait_idle(self._STOP_TIMEOUT):
+                self._event.clear()
+            else:
+                # 仍未退出的运行持有原事件对象，继续收到退出通知
+                logger.warning(f"清理运行在 {self._STOP_TIMEOUT} 秒内未退出，将在当前目录结束后停止")
+                self._event = ThreadEvent()
+            if self._watchdog:
+                self._watchdog.close()
+                self._watchdog = None
+                self._quarantine = None
@@ -0,0 +1,177 @@
+import os
+import time
+from threading import Condition, Event, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.log import logger
+
+# 等待目录空闲时检查退出事件的间隔（秒）
+_WAIT_INTERVAL = 1
+
+
+def _overlaps(a: str, b: str) -> bool:
+    a, b = a.rstrip(os.sep) + os.sep, b.rstrip(os.sep) + os.sep
+    return a.startswith(b) or b.startswith(a)
+
+
+class RunCoordinator:
+    """
+    运行协调器
+    同一目录（含嵌套目录）同时只允许一个遍历运行；
+    同类运行正在进行时到达的触发合并为结束后的一次后续运行；
+    目录忙时到达的受影响目录按清理目录合并，目录释放后在一个线程中统一检查
+    """
+
+    def __init__(self):
+        self._cond = Condition()
+        # 正在遍历的目录
+        self._busy: List[str] = []
+        # 正在运行的运行类型
+        self._running: Set[str] = set()
+        # 运行期间到达的触发参数
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        # 等待目录空闲的线程数
+        self._waiting = 0
+        # 待检查的受影响目录: {清理目录: {目录}}
+        self._deferred: Dict[str, Set[str]] = {}
+        self._deferred_func: Optional[Callable[[Dict[str, Set[str]]], None]] = None
+        # 正在有线程检查待检查的目录
+        self._draining = False
+
+    def acquire(self, paths: Iterable[str], stop_event: Optional[Event] = None) -> bool:
+        """
+        等待目录空闲并占用，收到退出事件时返回False
+        """
+        paths = list(paths)
+        with self._cond:
+            self._waiting += 1
+            try:
+                while any(_overlaps(path, busy) for path in paths for busy in self._busy):
+                    if stop_event and stop_event.is_set():
+                        return False
+                    self._cond.wait(_WAIT_INTERVAL)
+                self._busy.extend(paths)
+                return True
+            finally:
+                self._waiting -= 1
+                self._cond.notify_all()
+
+    def release(self, paths: Iterable[str]):
+        with self._cond:
+            for path in paths:
+                self._busy.remove(path)
+            self._cond.notify_all()
+            if not self._deferred or self._draining:
+                return
+            self._draining = True
+        Thread(target=self.__drain_deferred, name="EmptyFolderCleanerDeferred", daemon=True).start()
+
+    def check_dirs(self, dirs: Dict[str, Set[str]], func: Callable[[Dict[str, Set[str]]], None]):
+        """
+        检查受影响的目录，不等待：目录空闲时在当前线程检查，忙时合并到待检查的目录，目录释放后统一检查
+        :param dirs: 按清理目录分组的受影响目录
+        :param func: 检查函数，参数为按清理目录分组的目录，执行期间占用这些清理目录
+        """
+        with self._cond:
+            for root, paths in dirs.items():
+                self._deferred.setdefault(root, set()).update(paths)
+            self._deferred_func = func
+            if self._draining:
+                return
+            self._draining = True
+        self.__drain_deferred()
+
+    def cancel_deferred(self):
+        """
+        丢弃待检查的目录
+        """
+        with self._cond:
+            self._deferred.clear()
+            self._deferred_func = None
+
+    def __drain_deferred(self):
+        while True:
+            with self._cond:
+                ready = {root: paths for root, paths in self._deferred.items()
+                         if not any(_overlaps(root, busy) for busy in self._busy)}
+                func = self._deferred_func
+                if not ready or not func:
+                    # 仍忙的目录由占用它的运行释放时再检查
+                    self._draining = False
+                    self._cond.notify_all()
+                    return
+                for root in ready:
+                    del self._deferred[root]
+                self._busy.extend(ready)
+            try:
+                func(ready)
+            except Exception as e:
+                logger.error(f"实时清理出错：{str(e)}")
+            finally:
+                self.release(ready)
+
+    def run(self, kind: str, paths: Callable[[], List[str]], func: Callable[[List[Dict[str, Any]], bool], None],
+            stop_event: Optional[Event] = None, **trigger: Any) -> bool:
+        """
+        执行一次运行，同类运行进行中时合并到其后续运行并立即返回
+        :param kind: 运行类型
+        :param paths: 获取需要占用的目录，每次运行前重新获取
+        :param func: 运行函数，参数为(本次运行对应的触发参数, 是否为合并触发的后续运行)
+        :param trigger: 触发参数
+        返回: 是否在当前线程执行
+        """
+        with self._cond:
+            if kind in self._running:
+                self._pending.setdefault(kind, []).append(trigger)
+                logger.info("已有清理正在运行，本次触发将合并到其结束后的运行")
+                return False
+            self._running.add(kind)
+
+        triggers = [trigger]
+        follow_up = False
+        try:
+            while triggers:
+                locked = paths()
+                if not self.acquire(locked, stop_event):
+                    break
+                try:
+                    func(triggers, follow_up)
+                finally:
+                    self.release(locked)
+                if stop_event and stop_event.is_set():
+                    break
+                with self._cond:
+                    triggers = self._pending.pop(kind, [])
+                    follow_up = True
+                    if not triggers:
+                        # 在同一把锁内结束，之后到达的触发会开始新的运行
+                        self._running.discard(kind)
+        finally:
+            with self._cond:
+                if kind in self._running:
+                    self._running.discard(kind)
+                    dropped = self._pending.pop(kind, [])
+                    if dropped:
+                        logger.info(f"清理已停止，之后到达的 {len(dropped)} 次触发未执行")
+                self._cond.notify_all()
+        return True
+
+    def take_pending(self, kind: str) -> List[Dict[str, Any]]:
+        """
+        取出同类运行尚未执行的合并触发，运行被停止时用于记录未执行的触发
+        """
+        with self._cond:
+            return self._pending.pop(kind, [])
+
+    def wait_idle(self, timeout: float) -> bool:
+        """
+        等待所有运行结束，返回是否在超时前结束
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._busy or self._running or self._waiting or self._draining:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
@@ -0,0 +1,102 @@
+import fnmatch
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# 通配符字符，出现任意一个即按通配符模式匹配
+_GLOB_CHARS = set("*?[")
+# 前缀树节点中标记排除路径终点的键
+_TERMINAL = ""
+
+
+class ExcludeMatcher:
+    """
+    排除目录匹配器，每次配置变更时编译一次
+    支持三种写法：
+    - 绝对路径：排除该目录及其所有子目录，按路径层级匹配
+    - 目录名：排除任意位置的同名目录
+    - 通配符：如 *.tmp、/media/*/extras，按完整路径匹配，不含路径分隔符时按目录名匹配
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._names = set()
+        self._trie: Dict[str, dict] = {}
+        name_globs: List[str] = []
+        path_globs: List[str] = []
+
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern:
+                continue
+            has_sep = "/" in pattern or os.sep in pattern
+            if _GLOB_CHARS.intersection(pattern):
+                if not has_sep:
+                    name_globs.append(pattern)
+                elif os.path.isabs(pattern):
+                    path_globs.append(os.path.normpath(pattern))
+                else:
+                    path_globs.append(os.path.join("*", os.path.normpath(pattern)))
+            elif os.path.isabs(pattern):
+                self.__add_path(pattern)
+            elif has_sep:
+                # 相对路径按路径结尾匹配
+                path_globs.append(os.path.join("*", os.path.normpath(pattern)))
+            else:
+                self._names.add(pattern)
+
+        self._name_regex = self.__compile(name_globs)
+        self._path_regex = self.__compile(path_globs)
+
+    @classmethod
+    def from_config(cls, exclude_dirs: Optional[str]) -> "ExcludeMatcher":
+        """
+        从多行文本配置构建匹配器
+        """
+        return cls((exclude_dirs or "").split("\n"))
+
+    @staticmethod
+    def __compile(globs: List[str]):
+        if not globs:
+            return None
+        return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs))
+
+    @staticmethod
+    def __split(path: str) -> List[str]:
+        return [part for part in os.path.normpath(path).split(os.sep) if part]
+
+    def __add_path(self, path: str):
+        node = self._trie
+        for part in self.__split(path):
+            node = node.setdefault(part, {})
+        node[_TERMINAL] = {}
+
+    def __match_path(self, path: str) -> bool:
+        node = self._trie
+        for part in self.__split(path):
+            node = node.get(part)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self._names or self._trie or self._name_regex or self._path_regex)
+
+    def match(self, path: str, name: Optional[str] = None) -> bool:
+        """
+        检查目录是否被排除
+        :param path: 目录完整路径
+        :param name: 目录名，已知时传入可省去一次拆分
+        """
+        if name is None:
+            name = os.path.basename(path)
+        if name in self._names:
+            return True
+        if self._name_regex and self._name_regex.match(name):
+            return True
+        if self._trie and self.__match_path(path):
+            return True
+        if self._path_regex and self._path_regex.match(os.path.normpath(path)):
+            return True
+        return False
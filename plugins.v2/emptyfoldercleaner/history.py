@@ -0,0 +1,186 @@
+import base64
+import zlib
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+# 保留的运行记录数
+HISTORY_CAPACITY = 100
+# 单次运行记录的删除路径数上限
+_MAX_REMOVED_PATHS = 200000
+# 分页读取删除路径时每次解码的 base64 字符数，须为 4 的倍数
+_LOAD_CHUNK = 64 * 1024
+
+_META_KEY = "history_meta"
+_ENTRY_KEY = "history_{}"
+_REMOVED_KEY = "history_removed_{}"
+# 旧版本保存全部历史的键
+_LEGACY_KEY = "history"
+
+# 同一插件的多次运行可能并发写入
+_lock = Lock()
+
+
+class RemovedPathLog:
+    """
+    单次运行删除的路径，边删除边压缩，内存占用为压缩后的大小
+    """
+
+    def __init__(self, limit: int = _MAX_REMOVED_PATHS):
+        self._limit = limit
+        self._lock = Lock()
+        self._compressor = zlib.compressobj()
+        self._chunks: List[bytes] = []
+        self.count = 0
+        # 超出上限后不再记录
+        self.truncated = False
+
+    def add(self, path: str):
+        with self._lock:
+            if self.count >= self._limit:
+                self.truncated = True
+                return
+            self.count += 1
+            chunk = self._compressor.compress((path + "\n").encode("utf-8", "surrogateescape"))
+            if chunk:
+                self._chunks.append(chunk)
+
+    def dump(self) -> str:
+        """
+        结束记录，返回压缩后的 base64 文本
+        """
+        with self._lock:
+            self._chunks.append(self._compressor.flush())
+            return base64.b64encode(b"".join(self._chunks)).decode("ascii")
+
+    @staticmethod
+    def load(data: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """
+        解压删除的路径
+        :param offset: 跳过的路径数
+        :param limit: 只需要一页时分块解码解压，跳过的部分只计数不拆分，取够即停止
+        """
+        if limit is None:
+            text = zlib.decompress(base64.b64decode(data)).decode("utf-8", "surrogateescape")
+            return text.split("\n")[:-1][offset:]
+        decompressor = zlib.decompressobj()
+        paths: List[bytes] = []
+        buffer = b""
+        for start in range(0, len(data), _LOAD_CHUNK):
+            buffer += decompressor.decompress(base64.b64decode(data[start:start + _LOAD_CHUNK]))
+            if offset:
+                count = buffer.count(b"\n")
+                if count <= offset:
+                    offset -= count
+                    buffer = buffer[buffer.rfind(b"\n") + 1:]
+                    continue
+                lines = buffer.split(b"\n")[offset:]
+                offset = 0
+            else:
+                lines = buffer.split(b"\n")
+            buffer = lines.pop()
+            paths.extend(lines)
+            if len(paths) >= limit:
+                break
+        return [path.decode("utf-8", "surrogateescape") for path in paths[:limit]]
+
+
+class HistoryStore:
+    """
+    运行记录环形缓冲区
+    每条记录与其删除路径分别保存在按序号取模的固定槽位中，追加只写入一个槽位，
+    分页查询只读取所需页的槽位，与累计运行次数无关
+    """
+
+    def __init__(self, plugin: Any, capacity: int = HISTORY_CAPACITY):
+        """
+        :param plugin: 插件实例，通过其 get_data/save_data 读写数据
+        :param capacity: 保留的记录数
+        """
+        self._plugin = plugin
+        self._capacity = capacity
+
+    def __meta(self) -> Dict[str, int]:
+        meta = self._plugin.get_data(_META_KEY)
+        if meta is None:
+            meta = self.__migrate()
+        return meta
+
+    def __migrate(self) -> Dict[str, int]:
+        """
+        将旧版本的历史列表迁移到环形缓冲区
+        """
+        legacy = self._plugin.get_data(_LEGACY_KEY) or []
+        legacy = sorted(legacy, key=lambda x: x.get("clean_time", ""))[-self._capacity:]
+        for seq, entry in enumerate(legacy):
+            self._plugin.save_data(_ENTRY_KEY.format(seq % self._capacity), {**entry, "seq": seq})
+        meta = {"next": len(legacy)}
+        self._plugin.save_data(_META_KEY, meta)
+        if legacy:
+            self._plugin.del_data(_LEGACY_KEY)
+            logger.info(f"已迁移 {len(legacy)} 条清理历史")
+        return meta
+
+    def append(self, entry: Dict[str, Any], removed: Optional[RemovedPathLog] = None) -> int:
+        """
+        追加一条运行记录，覆盖最旧的槽位
+        返回: 记录序号
+        """
+        with _lock:
+            meta = self.__meta()
+            seq = meta["next"]
+            slot = seq % self._capacity
+            entry = {**entry, "seq": seq}
+            if removed is not None:
+                entry["removed_paths"] = removed.count
+                entry["removed_truncated"] = removed.truncated
+                self._plugin.save_data(_REMOVED_KEY.format(slot), {"seq": seq, "data": removed.dump()})
+            else:
+                self._plugin.del_data(_REMOVED_KEY.format(slot))
+            self._plugin.save_data(_ENTRY_KEY.format(slot), entry)
+            self._plugin.save_data(_META_KEY, {"next": seq + 1})
+            return seq
+
+    def __read(self, seq: int) -> Optional[Dict[str, Any]]:
+        entry = self._plugin.get_data(_ENTRY_KEY.format(seq % self._capacity))
+        if not entry or entry.get("seq") != seq:
+            return None
+        return entry
+
+    def total(self) -> int:
+        return min(self.__meta()["next"], self._capacity)
+
+    def page(self, page: int = 1, size: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        按时间降序分页读取
+        返回: (本页记录, 记录总数)
+        """
+        page, size = max(int(page), 1), min(max(int(size), 1), self._capacity)
+        latest = self.__meta()["next"] - 1
+        total = min(latest + 1, self._capacity)
+        start = (page - 1) * size
+        items = []
+        for offset in range(start, min(start + size, total)):
+            entry = self.__read(latest - offset)
+            if entry:
+                items.append(entry)
+        return items, total
+
+    def removed_paths(self, seq: int, offset: int = 0, limit: int = 1000) -> Optional[Tuple[List[str], int]]:
+        """
+        读取一次运行删除的路径
+        返回: (本页路径, 路径总数)，记录已被覆盖时返回None
+        """
+        record = self._plugin.get_data(_REMOVED_KEY.format(int(seq) % self._capacity))
+        if not record or record.get("seq") != int(seq):
+            return None
+        offset = max(int(offset), 0)
+        end = offset + max(int(limit), 1)
+        # 路径总数记录在运行记录中，只需解压到本页结束
+        entry = self.__read(int(seq))
+        total = entry.get("removed_paths") if entry else None
+        if total is None:
+            paths = RemovedPathLog.load(record["data"])
+            return paths[offset:end], len(paths)
+        return RemovedPathLog.load(record["data"], offset, end - offset), total
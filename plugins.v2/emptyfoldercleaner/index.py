@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock, local
+from typing import List, Optional, Tuple
+
+from app.log import logger
+
+# 目录修改时间在扫描开始前该时长内的不可信（部分文件系统时间精度较低），下次重新列出
+_MTIME_TRUST_MARGIN_NS = 2_000_000_000
+# 每累积多少次写入提交一次事务
+_COMMIT_BATCH = 1000
+# 子目录名分隔符，文件名中不可能出现
+_NAME_SEP = "\0"
+# 每个线程一次读入内存的子树行数上限
+_WINDOW_ROWS = 10000
+
+
+def _subtree_range(path: str) -> Tuple[str, str]:
+    """
+    子树的路径范围: [prefix, upper)
+    """
+    prefix = path.rstrip(os.sep) + os.sep
+    # 分隔符的下一个字符作为范围上界，命中所有以 prefix 开头的路径
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class DirectoryIndex:
+    """
+    目录修改时间索引，用于增量扫描
+    目录的修改时间只在其直接子项增删或改名时变化，修改时间未变的目录可直接复用上次的列出结果，
+    只需一次 stat 而无需重新读取目录项
+    查询时按子树读入内存：每个线程首次查询某个目录时，若其子树不超过 _WINDOW_ROWS 行则整棵读入，
+    之后该子树内的查询不访问数据库；超出上限的目录（通常只有靠近根的少数几层）逐行查询。
+    内存占用因此与每个线程的子树上限而非整个目录树成正比，代价是大目录多一次查询
+    写入在内存中累积后批量提交
+    """
+
+    def __init__(self, db_path: Path, fingerprint: str):
+        """
+        :param db_path: SQLite 数据库文件路径
+        :param fingerprint: 影响列出结果的配置指纹，变化时索引作废
+        """
+        self._lock = Lock()
+        # 各线程读入的子树: root 为子树根路径，rows 为 {路径: (修改时间, 是否包含内容, 是否为空, 子目录名)}
+        self._windows = local()
+        # 待写入的行
+        self._pending: List[Tuple[str, int, int, int, str]] = []
+        # 未提交的写入数
+        self._uncommitted = 0
+        self._scan_start_ns = time.time_ns()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, has_content INTEGER, empty INTEGER, children TEXT"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self.__get_meta("fingerprint") != fingerprint:
+            logger.info("清理配置已变化，目录索引重建")
+            self.clear()
+            self.__set_meta("fingerprint", fingerprint)
+            self._conn.commit()
+
+    def __get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def __set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def __delete_tree(self, path: str):
+        """
+        删除目录及其所有子目录的索引
+        """
+        prefix, upper = _subtree_range(path)
+        self._conn.execute("DELETE FROM dirs WHERE path=? OR (path>=? AND path<?)", (path, prefix, upper))
+
+    def __row(self, path: str, load: bool = False) -> Optional[Tuple[int, int, int, str]]:
+        """
+        查询目录上次的索引行，优先使用当前线程读入的子树
+        :param load: 不在已读入的子树内时，尝试读入该目录的子树
+        """
+        window = self._windows
+        root = getattr(window, "root", None)
+        if root is not None and (path == root or path.startswith(os.path.join(root, ""))):
+            return window.rows.get(path)
+        prefix, upper = _subtree_range(path)
+        with self._lock:
+            if load and not self._conn.execute(
+                    "SELECT 1 FROM dirs WHERE path>=? AND path<? LIMIT 1 OFFSET ?",
+                    (prefix, upper, _WINDOW_ROWS)).fetchone():
+                window.root = path
+                window.rows = {row[0]: row[1:] for row in self._conn.execute(
+                    "SELECT path, mtime_ns, has_content, empty, children FROM dirs "
+                    "WHERE path=? OR (path>=? AND path<?)", (path, prefix, upper))}
+                return window.rows.get(path)
+            row = self._conn.execute(
+                "SELECT mtime_ns, has_content, empty, children FROM dirs WHERE path=?", (path,)).fetchone()
+        return tuple(row) if row else None
+
+    def __write_pending(self):
+        """
+        写入累积的行，删除前调用以保证执行顺序
+        """
+        if self._pending:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, has_content, empty, children) VALUES (?, ?, ?, ?, ?)",
+                self._pending
+            )
+            self._pending.clear()
+
+    def __written(self):
+        self._uncommitted += 1
+        if self._uncommitted >= _COMMIT_BATCH:
+            self.__write_pending()
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def clear(self):
+        """
+        清空索引，下次扫描全部重新列出
+        """
+        with self._lock:
+            self._pending.clear()
+            self._windows = local()
+            self._conn.execute("DELETE FROM dirs")
+            self._conn.commit()
+
+    def begin_run(self, full_scan_interval: int, force_full: bool = False) -> bool:
+        """
+        开始一次扫描，返回本次是否为全量扫描
+        :param full_scan_interval: 每隔多少次增量扫描执行一次全量扫描
+        :param force_full: 强制全量扫描
+        """
+        with self._lock:
+            runs = int(self.__get_meta("incremental_runs") or 0)
+            full = force_full or runs >= full_scan_interval \
+                or not self._conn.execute("SELECT 1 FROM dirs LIMIT 1").fetchone()
+            self._windows = local()
+            if full:
+                self._conn.execute("DELETE FROM dirs")
+                runs = 0
+            else:
+                runs += 1
+            self.__set_meta("incremental_runs", str(runs))
+            self._conn.commit()
+            return full
+
+    def get(self, path: str, mtime_ns: int) -> Optional[Tuple[bool, bool, List[str]]]:
+        """
+        目录修改时间未变化时返回上次的结果: (是否包含内容, 上次是否判定为空, 子目录列表)
+        """
+        row = self.__row(path, load=True)
+        if not row or row[0] < 0 or row[0] != mtime_ns:
+            return None
+        prefix = os.path.join(path, "")
+        children = [prefix + name for name in row[3].split(_NAME_SEP)] if row[3] else []
+        return bool(row[1]), bool(row[2]), children
+
+    def put(self, path: str, mtime_ns: int, has_content: bool, empty: bool, subdirs: List[str]):
+        """
+        记录目录的列出结果与判定结果，并清理已消失子目录的索引
+        """
+        names = [os.path.basename(subdir) for subdir in subdirs]
+        if mtime_ns > self._scan_start_ns - _MTIME_TRUST_MARGIN_NS:
+            # 修改时间过新，下次仍需重新列出
+            mtime_ns = -1
+        row = self.__row(path)
+        gone = set(row[3].split(_NAME_SEP)).difference(names) if row and row[3] else None
+        with self._lock:
+            if gone:
+                self.__write_pending()
+                for name in gone:
+                    self.__delete_tree(os.path.join(path, name))
+            self._pending.append((path, mtime_ns, int(has_content), int(empty), _NAME_SEP.join(names)))
+            self.__written()
+
+    def update_verdict(self, path: str, empty: bool):
+        """
+        更新目录的判定结果
+        """
+        row = self.__row(path)
+        if row is None:
+            return
+        with self._lock:
+            self._pending.append((path, row[0], row[1], int(empty), row[3]))
+            self.__written()
+
+    def discard(self, path: str):
+        """
+        目录已删除，移除其索引
+        """
+        with self._lock:
+            self.__write_pending()
+            self.__delete_tree(path)
+            self.__written()
+
+    def close(self):
+        with self._lock:
+            self._windows = local()
+            try:
+                self.__write_pending()
+                self._conn.commit()
+            finally:
+                self._conn.close()
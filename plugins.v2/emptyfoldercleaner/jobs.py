@@ -0,0 +1,196 @@
+import os
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+from .metrics import ScanStats
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+# 已被覆盖其路径的任务合并
+JOB_MERGED = "merged"
+
+# 保留的已结束任务数
+_MAX_FINISHED_JOBS = 100
+
+
+def _contains(parent: str, path: str) -> bool:
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+class CleanJob:
+    """
+    指定目录的清理任务
+    """
+
+    def __init__(self, path: str, root: str, dry_run: bool):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.root = root
+        self.dry_run = dry_run
+        self.status = JOB_QUEUED
+        self.stats = ScanStats()
+        self.error: Optional[str] = None
+        # 合并到的任务
+        self.merged_into: Optional[str] = None
+        self.submit_time = datetime.now()
+        self.start_time: Optional[datetime] = None
+        self.finish_time: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in (JOB_QUEUED, JOB_RUNNING)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "path": self.path,
+            "dry_run": self.dry_run,
+            "status": self.status,
+            "merged_into": self.merged_into,
+            "error": self.error,
+            "submit_time": self.submit_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "start_time": self.start_time.strftime("%Y-%m-%d %H:%M:%S") if self.start_time else None,
+            "finish_time": self.finish_time.strftime("%Y-%m-%d %H:%M:%S") if self.finish_time else None,
+            # 运行中为实时进度
+            "progress": {
+                "dirs_visited": self.stats.dirs_visited,
+                "removed": self.stats.removed,
+                "skipped": self.stats.skipped,
+                "errors": self.stats.errors,
+            },
+        }
+
+
+class JobQueue:
+    """
+    有界清理任务队列
+    提交时与排队中的任务去重：路径已被覆盖的直接返回已有任务，覆盖已有任务路径的将其合并；
+    工作线程只取与运行中任务路径不重叠的任务执行
+    """
+
+    def __init__(self, runner: Callable[[CleanJob], None], workers: int = 2, max_pending: int = 100):
+        """
+        :param runner: 执行任务的回调，进度写入 job.stats，出错时抛出异常
+        :param workers: 工作线程数
+        :param max_pending: 排队任务数上限
+        """
+        self._runner = runner
+        self._max_pending = max_pending
+        self._cond = Condition()
+        self._pending: deque = deque()
+        self._running: List[CleanJob] = []
+        self._jobs: "OrderedDict[str, CleanJob]" = OrderedDict()
+        self._stopped = False
+        self._threads = [Thread(target=self.__work, name=f"EmptyFolderCleanerJob-{i}", daemon=True)
+                         for i in range(max(workers, 1))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, path: str, root: str, dry_run: bool) -> Tuple[Optional[CleanJob], str]:
+        """
+        提交任务，立即返回
+        返回: (任务, 说明)，队列已满或已停止时任务为None
+        """
+        with self._cond:
+            if self._stopped:
+                return None, "清理任务队列已停止"
+            for job in self._pending:
+                if job.dry_run == dry_run and _contains(job.path, path):
+                    return job, "已有排队中的任务包含该目录"
+            if len(self._pending) >= self._max_pending:
+                return None, "清理任务队列已满"
+            job = CleanJob(path, root, dry_run)
+            # 新任务覆盖的排队任务合并到新任务
+            for pending in [p for p in self._pending if p.dry_run == dry_run and _contains(path, p.path)]:
+                self._pending.remove(pending)
+                self.__finish(pending, JOB_MERGED)
+                pending.merged_into = job.job_id
+            self._pending.append(job)
+            self._jobs[job.job_id] = job
+            self.__trim()
+            self._cond.notify()
+            return job, "任务已提交"
+
+    def get(self, job_id: str) -> Optional[CleanJob]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job and job.merged_into:
+                return self._jobs.get(job.merged_into, job)
+            return job
+
+    def list(self) -> List[CleanJob]:
+        with self._cond:
+            return list(reversed(self._jobs.values()))
+
+    def stop(self):
+        """
+        停止队列，取消排队中的任务，运行中的任务由退出事件中断
+        """
+        with self._cond:
+            self._stopped = True
+            while self._pending:
+                self.__finish(self._pending.popleft(), JOB_CANCELLED)
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    @staticmethod
+    def __finish(job: CleanJob, status: str):
+        job.status = status
+        job.finish_time = datetime.now()
+
+    def __trim(self):
+        """
+        只保留最近的已结束任务
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - _MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def __next_job(self) -> Optional[CleanJob]:
+        for job in self._pending:
+            if not any(_contains(job.path, running.path) or _contains(running.path, job.path)
+                       for running in self._running):
+                return job
+        return None
+
+    def __work(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self.__next_job()
+                    if job:
+                        break
+                    self._cond.wait()
+                if not job:
+                    return
+                self._pending.remove(job)
+                self._running.append(job)
+                job.status = JOB_RUNNING
+                job.start_time = datetime.now()
+            status = JOB_DONE
+            try:
+                self._runner(job)
+            except Exception as e:
+                logger.error(f"清理任务 {job.job_id} 出错：{str(e)}")
+                job.error = str(e)
+                status = JOB_FAILED
+            with self._cond:
+                self._running.remove(job)
+                if self._stopped and status == JOB_DONE:
+                    # 运行中被退出事件中断
+                    status = JOB_CANCELLED
+                self.__finish(job, status)
+                self.__trim()
+                # 与该任务重叠的排队任务可能可以执行了
+                self._cond.notify_all()
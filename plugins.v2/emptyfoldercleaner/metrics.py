@@ -0,0 +1,123 @@
+import os
+from threading import Event, Thread
+from typing import Any, Dict, Optional
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+# 运行期间内存采样间隔（秒）
+_RSS_SAMPLE_INTERVAL = 1
+
+
+class ScanStats:
+    """
+    单次遍历的性能统计，每个遍历任务独立计数，结束后按清理目录合并
+    """
+    __slots__ = ("dirs_visited", "dirs_cached", "entries_listed", "dirs_excluded", "errors",
+                 "removed", "skipped", "recent", "dirs_quarantined", "total_seconds", "list_seconds", "delete_seconds", "throttle_seconds")
+
+    def __init__(self):
+        # 访问的目录数
+        self.dirs_visited = 0
+        # 复用增量索引、未重新列出的目录数
+        self.dirs_cached = 0
+        # 列出的目录项数
+        self.entries_listed = 0
+        # 剪枝的排除目录数
+        self.dirs_excluded = 0
+        # 列出或删除出错次数
+        self.errors = 0
+        # 删除的文件夹数
+        self.removed = 0
+        # 因检查后写入新内容而跳过删除的文件夹数
+        self.skipped = 0
+        # 修改时间过新而暂不删除的空文件夹数
+        self.recent = 0
+        # 处于隔离期或操作超时而跳过的目录数
+        self.dirs_quarantined = 0
+        # 遍历总耗时
+        self.total_seconds = 0.0
+        # 打开与列出目录耗时
+        self.list_seconds = 0.0
+        # 删除耗时
+        self.delete_seconds = 0.0
+        # 限速等待耗时
+        self.throttle_seconds = 0.0
+
+    def merge(self, other: "ScanStats"):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dirs_visited": self.dirs_visited,
+            "dirs_cached": self.dirs_cached,
+            "entries_listed": self.entries_listed,
+            "dirs_excluded": self.dirs_excluded,
+            "errors": self.errors,
+            "removed": self.removed,
+            "skipped": self.skipped,
+            "recent": self.recent,
+            "dirs_quarantined": self.dirs_quarantined,
+            "seconds": round(self.total_seconds, 3),
+            "walk_seconds": round(self.list_seconds, 3),
+            # 判定与索引等其余耗时
+            "evaluate_seconds": round(max(self.total_seconds - self.list_seconds - self.delete_seconds
+                                          - self.throttle_seconds, 0), 3),
+            "delete_seconds": round(self.delete_seconds, 3),
+            "throttle_seconds": round(self.throttle_seconds, 3),
+        }
+
+
+def current_rss_kb() -> Optional[int]:
+    """
+    进程当前的常驻内存（KB），读取 /proc/self/statm，不支持的平台返回None
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * _PAGE_SIZE // 1024
+
+
+class RssSampler:
+    """
+    单次运行的内存占用
+    进程内存峰值（ru_maxrss）自 MoviePilot 启动起只增不减，无法反映单次运行，
+    因此记录运行开始、结束时的常驻内存，以及运行期间按间隔采样的最大值
+    """
+
+    def __init__(self, interval: float = _RSS_SAMPLE_INTERVAL):
+        self._interval = interval
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._start_kb: Optional[int] = None
+        self._peak_kb: Optional[int] = None
+
+    def start(self):
+        self._start_kb = self._peak_kb = current_rss_kb()
+        if self._start_kb is None:
+            return
+        self._thread = Thread(target=self.__sample, name="EmptyFolderCleanerRss", daemon=True)
+        self._thread.start()
+
+    def __sample(self):
+        while not self._stop.wait(self._interval):
+            rss = current_rss_kb()
+            if rss is not None and rss > self._peak_kb:
+                self._peak_kb = rss
+
+    def stop(self) -> Dict[str, Optional[int]]:
+        """
+        结束采样
+        返回: 开始、结束时的常驻内存与运行期间的最大值（KB）
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        end_kb = current_rss_kb()
+        peak_kb = max(self._peak_kb, end_kb) if self._peak_kb is not None and end_kb is not None else self._peak_kb
+        return {"start_kb": self._start_kb, "end_kb": end_kb, "peak_kb": peak_kb}
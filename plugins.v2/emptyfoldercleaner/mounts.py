@@ -0,0 +1,107 @@
+import os
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from app.log import logger
+
+# 挂载信息文件，只在 Linux 上存在
+_MOUNTINFO_PATH = "/proc/self/mountinfo"
+# 挂载点中空格等字符以八进制转义
+_ESCAPE_RE = re.compile(r"\\([0-7]{3})")
+
+
+def _unescape(path: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)), path)
+
+
+def _contains(parent: str, path: str) -> bool:
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def parse_fs_types(text: Optional[str]) -> Set[str]:
+    """
+    解析跳过的文件系统类型，逗号或换行分隔
+    """
+    return {fs_type.strip().lower() for fs_type in re.split(r"[,\n]", text or "") if fs_type.strip()}
+
+
+class MountTable:
+    """
+    系统挂载表，每次运行读取一次，用于在遍历前确定需要剪枝的挂载点
+    """
+
+    def __init__(self, mounts: List[Tuple[str, str]]):
+        """
+        :param mounts: [(挂载点, 文件系统类型)]
+        """
+        self._mounts = mounts
+
+    @classmethod
+    def load(cls) -> Optional["MountTable"]:
+        """
+        读取挂载表，平台不支持时返回None
+        """
+        try:
+            with open(_MOUNTINFO_PATH, encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        mounts = []
+        for line in lines:
+            # 格式：ID 父ID 主:次 根 挂载点 选项 [可选字段...] - 类型 来源 超级块选项
+            left, sep, right = line.partition(" - ")
+            fields = left.split()
+            if not sep or len(fields) < 5 or not right.split():
+                continue
+            mounts.append((_unescape(fields[4]), right.split()[0].lower()))
+        return cls(mounts)
+
+    def fs_type(self, path: str) -> Optional[str]:
+        """
+        路径所在文件系统的类型
+        """
+        matched = [(mount_point, fs_type) for mount_point, fs_type in self._mounts if _contains(mount_point, path)]
+        if not matched:
+            return None
+        # 同一挂载点多次挂载时以最后一次为准
+        return max(matched, key=lambda x: len(x[0]))[1]
+
+    def boundaries(self, root: str, one_filesystem: bool, skip_fs_types: Set[str]) -> Set[str]:
+        """
+        清理目录下需要剪枝的挂载点，返回以清理目录原始路径表示的路径
+        :param one_filesystem: 剪枝所有挂载点，只清理清理目录所在的文件系统
+        :param skip_fs_types: 剪枝这些类型的挂载点
+        """
+        real_root = os.path.realpath(root)
+        boundaries = set()
+        for mount_point, fs_type in self._mounts:
+            if mount_point == real_root or not _contains(real_root, mount_point):
+                continue
+            if one_filesystem or fs_type in skip_fs_types:
+                # 挂载表中为真实路径，清理目录可能经过符号链接
+                boundaries.add(os.path.join(root, os.path.relpath(mount_point, real_root)))
+        return boundaries
+
+
+def find_boundaries(roots: Iterable[str], one_filesystem: bool,
+                    skip_fs_types: Set[str]) -> Tuple[Set[str], Set[str], bool]:
+    """
+    计算各清理目录下需要剪枝的挂载点
+    返回: (剪枝的挂载点, 位于跳过类型文件系统上的清理目录, 挂载表是否可用)
+    """
+    boundaries, skipped_roots = set(), set()
+    if not one_filesystem and not skip_fs_types:
+        return boundaries, skipped_roots, True
+    table = MountTable.load()
+    if table is None:
+        if skip_fs_types:
+            logger.warning("无法读取系统挂载表，跳过文件系统类型的设置不生效")
+        return boundaries, skipped_roots, False
+    for root in roots:
+        if table.fs_type(os.path.realpath(root)) in skip_fs_types:
+            skipped_roots.add(root)
+            continue
+        boundaries.update(table.boundaries(root, one_filesystem, skip_fs_types))
+    if boundaries:
+        logger.info(f"跳过 {len(boundaries)} 个挂载点：{', '.join(sorted(boundaries))}")
+    return boundaries, skipped_roots, True
@@ -0,0 +1,123 @@
+import errno
+import queue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, List, Optional
+
+from app.log import logger
+
+
+class _Task:
+    __slots__ = ("func", "args", "on_abandon", "result", "error", "done", "abandoned", "lock")
+
+    def __init__(self, func: Callable, args: tuple, on_abandon: Optional[Callable[[], None]]):
+        self.func = func
+        self.args = args
+        self.on_abandon = on_abandon
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = Event()
+        self.abandoned = False
+        self.lock = Lock()
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except BaseException as e:
+            self.error = e
+        with self.lock:
+            self.done.set()
+            abandoned = self.abandoned
+        # 超时后才完成的操作由回调释放其占用的资源
+        if abandoned and self.on_abandon:
+            try:
+                self.on_abandon()
+            except Exception as e:
+                logger.debug(f"释放超时操作的资源失败：{str(e)}")
+
+
+class _Worker:
+    def __init__(self, name: str):
+        self.queue: "queue.SimpleQueue[Optional[_Task]]" = queue.SimpleQueue()
+        self.thread = Thread(target=self.__loop, name=name, daemon=True)
+        self.thread.start()
+
+    def __loop(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            task.run()
+
+
+# 保留的空闲工作线程数
+_MAX_IDLE = 8
+
+
+class Watchdog:
+    """
+    带超时的文件系统操作
+    操作在共享的工作线程中执行，执行完后工作线程放回空闲列表复用；超时后放弃该工作线程
+    （阻塞在失效挂载上的系统调用无法中断），调用方不会被一个失效的挂载拖住
+    """
+
+    def __init__(self, timeout: float):
+        """
+        :param timeout: 单次操作超时（秒）
+        """
+        self.timeout = timeout
+        self._lock = Lock()
+        # 空闲的工作线程，同时进行的操作各占用一个
+        self._idle: List[_Worker] = []
+        self._closed = False
+        self._created = 0
+        # 已放弃、可能仍阻塞的工作线程数
+        self.abandoned = 0
+
+    def __acquire(self) -> _Worker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+            return _Worker(f"EmptyFolderCleanerWatchdog-{self._created}")
+
+    def __release(self, worker: _Worker):
+        with self._lock:
+            if not self._closed and len(self._idle) < _MAX_IDLE:
+                self._idle.append(worker)
+                return
+        worker.queue.put(None)
+
+    def run(self, func: Callable, *args: Any, path: str = "", on_abandon: Optional[Callable[[], None]] = None) -> Any:
+        """
+        执行操作，超时抛出 TimeoutError
+        :param path: 操作的路径，用于错误信息
+        :param on_abandon: 超时的操作最终完成时调用，用于关闭其打开的句柄
+        """
+        if self._closed:
+            return func(*args)
+        worker = self.__acquire()
+        task = _Task(func, args, on_abandon)
+        worker.queue.put(task)
+        if not task.done.wait(self.timeout):
+            with task.lock:
+                if not task.done.is_set():
+                    task.abandoned = True
+            if task.abandoned:
+                # 工作线程在当前操作结束后退出，不再放回空闲列表
+                worker.queue.put(None)
+                with self._lock:
+                    self.abandoned += 1
+                raise TimeoutError(errno.ETIMEDOUT, f"操作超过 {self.timeout} 秒未完成", path)
+        self.__release(worker)
+        if task.error:
+            raise task.error
+        return task.result
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for worker in self._idle:
+                worker.queue.put(None)
+            self._idle.clear()
+        if self.abandoned:
+            logger.warning(f"{self.abandoned} 个超时的文件系统操作仍未返回")
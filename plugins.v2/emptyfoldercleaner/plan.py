@@ -0,0 +1,147 @@
+import os
+import posixpath
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.log import logger
+
+from .storage import LOCAL_STORAGE, parse_storage_root
+from .throttle import parse_io_limits
+from .optimeout import Watchdog
+
+
+def _contains(parent: str, path: str, sep: str = os.sep) -> bool:
+    return path == parent or path.startswith(parent.rstrip(sep) + sep)
+
+
+def _stricter(a: float, b: float) -> float:
+    """
+    合并两个限速值，-1 为未设置，0 为不限制
+    """
+    if a < 0 or (a == 0 and b > 0):
+        return b
+    if b < 0 or b == 0:
+        return a
+    return min(a, b)
+
+
+class RootPlan:
+    """
+    清理目录的执行计划
+    同一目录（含经符号链接的不同写法）只保留第一次出现的写法，被其它清理目录包含的目录不再单独遍历，
+    但仍作为清理目录保留，不会被删除
+    """
+
+    def __init__(self):
+        # 需要遍历的本地清理目录，保持配置中的写法与顺序
+        self.local_roots: List[str] = []
+        # 需要遍历的存储目录: [(存储名, 路径)]
+        self.storage_roots: List[Tuple[str, str]] = []
+        # 被其它清理目录包含的目录，以包含它的清理目录下的路径表示
+        self.protected: Set[str] = set()
+        # 被其它存储目录包含的存储目录: {存储名: {路径}}
+        self.storage_protected: Dict[str, Set[str]] = {}
+        # 各清理目录合并后的限速: {清理目录: (每秒列出数, 并发数)}
+        self.limits: Dict[str, Tuple[float, int]] = {}
+        # 不存在或不是目录的本地清理目录
+        self.missing: List[str] = []
+        # 未单独遍历的清理目录: [(清理目录, 原因)]
+        self.merged: List[Tuple[str, str]] = []
+
+    @property
+    def root_count(self) -> int:
+        return len(self.local_roots) + len(self.storage_roots)
+
+    def log(self):
+        for root in self.missing:
+            logger.warning(f"清理目录不存在或不是目录：{root}")
+        for root, reason in self.merged:
+            logger.info(f"清理目录 {root} {reason}，不再单独遍历")
+        roots = self.local_roots + [f"{storage}:{path}" for storage, path in self.storage_roots]
+        logger.info(f"清理计划：共 {len(roots)} 个清理目录：{', '.join(roots)}")
+
+
+def _resolve(path: str, watchdog: Optional[Watchdog]) -> Optional[str]:
+    """
+    检查目录并解析真实路径，不是目录时返回None；超时的目录保留原路径，由遍历时的隔离处理
+    """
+    if watchdog is None:
+        return os.path.realpath(path) if os.path.isdir(path) else None
+    try:
+        if not watchdog.run(os.path.isdir, path, path=path):
+            return None
+        return watchdog.run(os.path.realpath, path, path=path)
+    except TimeoutError:
+        logger.warning(f"检查清理目录 {path} 超时，按原路径处理")
+        return path
+
+
+def build_root_plan(target_dirs: Optional[str], io_limits: Optional[str] = None,
+                    watchdog: Optional[Watchdog] = None) -> RootPlan:
+    """
+    解析清理目录，解析符号链接后去除重复与嵌套的目录，并合并被合并目录的限速设置
+    :param watchdog: 提供时检查目录的操作带超时，失效的挂载不会阻塞规划
+    """
+    plan = RootPlan()
+    limits = parse_io_limits(io_limits)
+    # 本地清理目录的真实路径，按首次出现的顺序: {配置写法: 真实路径}
+    local: Dict[str, str] = {}
+    storage: List[Tuple[str, str]] = []
+    for line in (target_dirs or "").split("\n"):
+        if not line.strip():
+            continue
+        name, path = parse_storage_root(line)
+        if name != LOCAL_STORAGE:
+            if (name, path) not in storage:
+                storage.append((name, path))
+            continue
+        path = os.path.normpath(path)
+        if path in local or path in plan.missing:
+            continue
+        real = _resolve(path, watchdog)
+        if real is None:
+            plan.missing.append(path)
+        else:
+            local[path] = real
+
+    # 同一真实路径只保留第一次出现的写法
+    unique: Dict[str, str] = {}
+    # 合并到的清理目录: {配置写法: 保留的写法}
+    targets: Dict[str, str] = {}
+    for path, real in local.items():
+        first = next((root for root, root_real in unique.items() if root_real == real), None)
+        if first:
+            plan.merged.append((path, f"与 {first} 为同一目录"))
+            targets[path] = first
+        else:
+            unique[path] = real
+
+    # 嵌套的目录由最外层的清理目录遍历，包含关系可传递，最外层即真实路径最短的包含者
+    for path, real in unique.items():
+        covers = [root for root, root_real in unique.items() if root_real != real and _contains(root_real, real)]
+        if not covers:
+            plan.local_roots.append(path)
+            targets[path] = path
+            continue
+        root = min(covers, key=lambda x: len(unique[x]))
+        plan.merged.append((path, f"已包含在 {root} 中"))
+        plan.protected.add(os.path.normpath(os.path.join(root, os.path.relpath(real, unique[root]))))
+        targets[path] = root
+    for path, first in list(targets.items()):
+        targets[path] = targets[first]
+
+    for root in plan.local_roots:
+        plan.limits[root] = (-1, -1)
+    for path, root in targets.items():
+        rate, concurrency = limits.get(path) or limits.get(local[path]) or (-1, -1)
+        merged_rate, merged_concurrency = plan.limits[root]
+        plan.limits[root] = (_stricter(merged_rate, rate), int(_stricter(merged_concurrency, concurrency)))
+
+    for name, path in storage:
+        cover = next((root for other, root in storage
+                      if other == name and root != path and _contains(root, path, posixpath.sep)), None)
+        if cover:
+            plan.merged.append((f"{name}:{path}", f"已包含在 {name}:{cover} 中"))
+            plan.storage_protected.setdefault(name, set()).add(path)
+        else:
+            plan.storage_roots.append((name, path))
+    return plan
@@ -0,0 +1,193 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from app.log import logger
+
+_PREFIX = "profile_"
+# 采样间隔（秒）
+_SAMPLE_INTERVAL = 0.01
+# 采样的调用栈深度上限
+_MAX_DEPTH = 128
+# 线程等待不计入耗时排行
+_IDLE_FUNCTIONS = {"<method 'acquire' of '_thread.lock' objects>"}
+
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _function_name(key) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class RunProfiler:
+    """
+    单次运行的性能分析
+    参与运行的线程各自启用确定性分析（cProfile），结束时合并保存为 pstats；
+    同时按固定间隔采样这些线程的调用栈，保存为可用于生成火焰图的折叠栈文件
+    Python 3.12 起进程内同时只能启用一个 cProfile，运行线程上的分析器会记录所有线程
+    （包括插件之外的线程）的调用，并发线程无法再单独启用，只通过采样计入折叠栈
+    """
+
+    def __init__(self, directory: Path, keep: int = 5):
+        """
+        :param directory: 分析结果目录
+        :param keep: 保留的分析结果数
+        """
+        self._directory = directory
+        self._keep = max(keep, 1)
+        self._lock = threading.Lock()
+        # 已启用的各线程分析器: {线程ID: 分析器}
+        self._profiles: Dict[int, cProfile.Profile] = {}
+        # 无法启用分析器的线程，不再重试
+        self._unprofiled: Set[int] = set()
+        # 正在参与运行、需要采样的线程
+        self._active: Dict[int, int] = {}
+        self._samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.name: Optional[str] = None
+
+    def start(self):
+        """
+        开始分析，当前线程计入分析
+        """
+        self._sampler = threading.Thread(target=self.__sample, name="EmptyFolderCleanerProfiler", daemon=True)
+        self._sampler.start()
+        self.attach()
+
+    def attach(self):
+        """
+        当前线程开始参与运行
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = self._active.get(ident, 0) + 1
+            if self._active[ident] > 1 or ident in self._unprofiled:
+                return
+            profile = self._profiles.get(ident)
+        if profile is None:
+            profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 起已有其它线程启用了分析器，本线程只参与采样
+            with self._lock:
+                self._unprofiled.add(ident)
+            return
+        with self._lock:
+            self._profiles[ident] = profile
+
+    def detach(self):
+        """
+        当前线程结束参与运行
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            count = self._active.get(ident, 0) - 1
+            if count > 0:
+                self._active[ident] = count
+                return
+            self._active.pop(ident, None)
+            profile = self._profiles.get(ident)
+        if profile is not None:
+            profile.disable()
+
+    def __sample(self):
+        while not self._stop.wait(_SAMPLE_INTERVAL):
+            with self._lock:
+                idents = list(self._active)
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and len(stack) < _MAX_DEPTH:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self._samples[";".join(reversed(stack))] += 1
+
+    def stop(self, top: int = 5) -> List[Dict[str, Any]]:
+        """
+        结束分析并保存结果
+        :param top: 汇总的函数数
+        返回: 自身耗时最多的函数
+        """
+        self.detach()
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        with self._lock:
+            profiles = list(self._profiles.values())
+            self._profiles.clear()
+            self._unprofiled.clear()
+            self._active.clear()
+        stats = pstats.Stats()
+        for profile in profiles:
+            # 没有记录到调用的分析器无法合并
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        base = f"{_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        stem = base
+        seq = 1
+        while any(self._directory.glob(f"{stem}.*")):
+            seq += 1
+            stem = f"{base}-{seq}"
+        stats.dump_stats(str(self._directory / f"{stem}.pstats"))
+        with open(self._directory / f"{stem}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._samples.items()):
+                f.write(f"{stack} {count}\n")
+        self.name = stem
+        self.__cleanup()
+
+        # (调用次数, 原始调用次数, 自身耗时, 累计耗时, 调用方)
+        entries = [(key, value) for key, value in stats.stats.items() if key[2] not in _IDLE_FUNCTIONS]
+        entries.sort(key=lambda x: x[1][2], reverse=True)
+        return [{
+            "function": _function_name(key),
+            "calls": value[1],
+            "self": round(value[2], 3),
+            "cumulative": round(value[3], 3)
+        } for key, value in entries[:top]]
+
+    def __cleanup(self):
+        """
+        删除超出保留数量的旧分析结果
+        """
+        for entry in list_profiles(self._directory)[self._keep:]:
+            for suffix in (".pstats", ".collapsed"):
+                try:
+                    (self._directory / f"{entry['name']}{suffix}").unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"删除旧分析结果 {entry['name']} 失败：{str(e)}")
+
+
+def list_profiles(directory: Path) -> List[Dict[str, Any]]:
+    """
+    列出分析结果，按时间降序
+    """
+    if not directory.is_dir():
+        return []
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.startswith(_PREFIX) and entry.name.endswith(".pstats"):
+            entries.append((entry.name[:-len(".pstats")], entry.stat()))
+    entries.sort(key=lambda x: x[1].st_mtime, reverse=True)
+    return [{
+        "name": name,
+        "size": stat.st_size,
+        "time": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    } for name, stat in entries]
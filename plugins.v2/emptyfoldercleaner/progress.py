@@ -0,0 +1,104 @@
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from .metrics import ScanStats
+
+
+class RunProgress:
+    """
+    清理运行的实时进度
+    遍历线程只累加各自的统计对象，查询时汇总，遍历过程中没有额外的同步开销
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.__reset()
+
+    def __reset(self):
+        self._running = False
+        self._trigger: Optional[str] = None
+        self._start_time: Optional[datetime] = None
+        self._start = 0.0
+        self._roots: List[str] = []
+        # 各清理目录的进行中任务数
+        self._active: Dict[str, int] = {}
+        self._done: List[str] = []
+        self._stats: List[ScanStats] = []
+        self._estimated = 0
+
+    def start(self, roots: List[str], trigger: Optional[str] = None, estimated: int = 0):
+        """
+        开始一次运行
+        :param roots: 本次运行的清理目录
+        :param estimated: 预计访问的目录数，取自上次运行
+        """
+        with self._lock:
+            self.__reset()
+            self._running = True
+            self._trigger = trigger
+            self._start_time = datetime.now()
+            self._start = time.monotonic()
+            self._roots = list(roots)
+            self._estimated = estimated
+
+    def track(self, stats: ScanStats):
+        """
+        登记遍历中的统计对象，查询时读取其实时值
+        """
+        with self._lock:
+            self._stats.append(stats)
+
+    def enter(self, root: str):
+        with self._lock:
+            self._active[root] = self._active.get(root, 0) + 1
+
+    def leave(self, root: str):
+        with self._lock:
+            count = self._active.get(root, 0) - 1
+            if count > 0:
+                self._active[root] = count
+            else:
+                self._active.pop(root, None)
+
+    def finish_root(self, root: str):
+        with self._lock:
+            if root not in self._done:
+                self._done.append(root)
+
+    def finish(self):
+        with self._lock:
+            self._running = False
+            self._active.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if not self._start_time:
+                return {"running": False}
+            elapsed = time.monotonic() - self._start
+            visited = sum(stats.dirs_visited for stats in self._stats)
+            removed = sum(stats.removed for stats in self._stats)
+            throughput = visited / elapsed if elapsed > 0 else 0
+            progress = {
+                "running": self._running,
+                "trigger": self._trigger,
+                "start_time": self._start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "elapsed": round(elapsed, 1),
+                "current_roots": list(self._active),
+                "roots_done": len(self._done),
+                "roots_total": len(self._roots),
+                "dirs_visited": visited,
+                "removed": removed,
+                # 每秒访问的目录数
+                "throughput": round(throughput, 1),
+                "estimated_total": self._estimated or None,
+                "percent": None,
+                "eta": None,
+            }
+            if self._running and self._estimated:
+                # 本次访问数超过上次时无法估计
+                remaining = max(self._estimated - visited, 0)
+                progress["percent"] = round(min(visited / self._estimated, 1) * 100, 1)
+                progress["eta"] = round(remaining / throughput) if throughput and remaining else None
+            return progress
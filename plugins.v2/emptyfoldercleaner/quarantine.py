@@ -0,0 +1,94 @@
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, List
+
+from app.log import logger
+
+_DATA_KEY = "quarantine"
+# 隔离时长上限（秒）
+_MAX_SECONDS = 24 * 3600
+
+
+class Quarantine:
+    """
+    操作超时的目录隔离列表，跨运行保存
+    隔离期间目录及其子目录不再访问，视为非空；连续超时时隔离时长逐次翻倍，隔离到期后访问成功即解除
+    """
+
+    def __init__(self, plugin: Any, base_seconds: float):
+        """
+        :param plugin: 插件实例，通过其 get_data/save_data 读写数据
+        :param base_seconds: 首次超时的隔离时长
+        """
+        self._plugin = plugin
+        self._base = max(base_seconds, 1)
+        self._lock = Lock()
+        # {路径: {"until": 到期时间戳, "failures": 连续超时次数, "since": 首次超时时间}}
+        self._entries: Dict[str, Dict[str, Any]] = dict(plugin.get_data(_DATA_KEY) or {})
+        self._dirty = False
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def blocked(self, path: str) -> bool:
+        """
+        目录本身处于隔离期
+        """
+        entry = self._entries.get(path)
+        return bool(entry) and entry["until"] > time.time()
+
+    def covers(self, path: str) -> bool:
+        """
+        目录本身或其任一父目录处于隔离期
+        """
+        if not self._entries:
+            return False
+        while True:
+            if self.blocked(path):
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+    def add(self, path: str):
+        """
+        隔离超时的目录，连续超时时隔离时长翻倍
+        """
+        with self._lock:
+            entry = self._entries.get(path) or {"failures": 0, "since": time.time()}
+            failures = entry["failures"] + 1
+            seconds = min(self._base * 2 ** (failures - 1), _MAX_SECONDS)
+            self._entries[path] = {**entry, "failures": failures, "until": time.time() + seconds}
+            self._dirty = True
+        logger.warning(f"目录 {path} 操作超时，隔离 {round(seconds / 60)} 分钟")
+
+    def release(self, path: str):
+        """
+        隔离到期后访问成功，解除隔离
+        """
+        if path not in self._entries:
+            return
+        with self._lock:
+            if self._entries.pop(path, None) is not None:
+                self._dirty = True
+                logger.info(f"目录 {path} 已恢复访问，解除隔离")
+
+    def active(self) -> List[Dict[str, Any]]:
+        """
+        处于隔离期的目录
+        """
+        now = time.time()
+        with self._lock:
+            entries = sorted(self._entries.items())
+        return [{"path": path, "failures": entry["failures"],
+                 "until": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["until"]))}
+                for path, entry in entries if entry["until"] > now]
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._plugin.save_data(_DATA_KEY, dict(self._entries))
+            self._dirty = False
@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from app.log import logger
+
+# 报告格式
+REPORT_JSONL = "jsonl"
+REPORT_CSV = "csv"
+
+# 判定结果
+DECISION_REMOVED = "removed"
+DECISION_WOULD_REMOVE = "would_remove"
+DECISION_KEPT = "kept"
+DECISION_SKIPPED = "skipped"
+
+# 判定原因
+REASON_EMPTY = "empty"
+REASON_NOT_EMPTY = "not_empty"
+REASON_EXCLUDED = "excluded"
+REASON_MOUNT = "mount"
+REASON_RECENT = "recent"
+REASON_CHANGED = "changed"
+REASON_GONE = "gone"
+REASON_PROTECTED = "protected"
+REASON_QUARANTINED = "quarantined"
+REASON_ERROR = "error"
+
+_FIELDS = ["path", "decision", "reason", "elapsed", "list_ms"]
+_PREFIX = "report_"
+# 单个报告文件大小上限，超过后写入新的分卷
+_MAX_BYTES = 50 * 1024 * 1024
+
+
+class ReportWriter:
+    """
+    运行报告，逐行追加写入每个目录的判定结果
+    每次运行一个文件，超过大小上限时切换到新的分卷，只保留最近的若干份
+    """
+
+    def __init__(self, directory: Path, fmt: str = REPORT_JSONL, keep: int = 10, max_bytes: int = _MAX_BYTES):
+        """
+        :param directory: 报告目录
+        :param fmt: jsonl 或 csv
+        :param keep: 保留的报告文件数
+        :param max_bytes: 单个文件大小上限
+        """
+        self._directory = directory
+        self._fmt = fmt if fmt == REPORT_CSV else REPORT_JSONL
+        self._keep = max(keep, 1)
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._start = time.monotonic()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        base = f"{_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self._stem = base
+        # 同一秒内的多次运行不覆盖之前的报告
+        seq = 1
+        while any(self._directory.glob(f"{self._stem}.*")) or any(self._directory.glob(f"{self._stem}_*")):
+            seq += 1
+            self._stem = f"{base}-{seq}"
+        self._part = 0
+        self._file = None
+        self._writer = None
+        self.lines = 0
+        # 首个分卷的文件名
+        self.name: Optional[str] = None
+        self.__open()
+        self.__cleanup()
+
+    def __open(self):
+        self._part += 1
+        suffix = "" if self._part == 1 else f"_{self._part}"
+        name = f"{self._stem}{suffix}.{self._fmt}"
+        self._file = open(self._directory / name, "w", encoding="utf-8", errors="backslashreplace", newline="")
+        if self._fmt == REPORT_CSV:
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(_FIELDS)
+        if not self.name:
+            self.name = name
+
+    def __cleanup(self):
+        """
+        删除超出保留数量的旧报告
+        """
+        for path in list_reports(self._directory)[self._keep:]:
+            try:
+                (self._directory / path["name"]).unlink()
+            except OSError as e:
+                logger.warning(f"删除旧报告 {path['name']} 失败：{str(e)}")
+
+    def write(self, path: str, decision: str, reason: str, list_ms: Optional[float] = None):
+        row = [path, decision, reason, round(time.monotonic() - self._start, 3),
+               round(list_ms, 3) if list_ms is not None else None]
+        with self._lock:
+            if not self._file:
+                return
+            if self._fmt == REPORT_CSV:
+                self._writer.writerow(row)
+            else:
+                self._file.write(json.dumps(dict(zip(_FIELDS, row)), ensure_ascii=False) + "\n")
+            self.lines += 1
+            if self._file.tell() >= self._max_bytes:
+                self._file.close()
+                self.__open()
+                self.__cleanup()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def list_reports(directory: Path) -> List[Dict[str, Any]]:
+    """
+    列出报告文件，按时间降序
+    """
+    if not directory.is_dir():
+        return []
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.startswith(_PREFIX) \
+                and entry.name.endswith((f".{REPORT_JSONL}", f".{REPORT_CSV}")):
+            entries.append((entry.name, entry.stat()))
+    entries.sort(key=lambda x: x[1].st_mtime, reverse=True)
+    return [{
+        "name": name,
+        "size": stat.st_size,
+        "time": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    } for name, stat in entries]
+
+
+def read_report(directory: Path, name: str, offset: int = 0, limit: int = 100,
+                decision: Optional[str] = None, reason: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    流式读取报告，只解析所需的行
+    :param name: 报告文件名，不允许包含路径
+    :param decision: 只返回该判定结果的行
+    :param reason: 只返回该原因的行
+    返回: 本页记录，文件不存在时返回None
+    """
+    if not name or os.path.basename(name) != name or not name.startswith(_PREFIX):
+        return None
+    path = directory / name
+    if not path.is_file():
+        return None
+    offset, limit = max(int(offset), 0), max(int(limit), 1)
+    rows = []
+    matched = 0
+    with open(path, encoding="utf-8", newline="") as f:
+        if name.endswith(f".{REPORT_CSV}"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            if decision and record.get("decision") != decision:
+                continue
+            if reason and record.get("reason") != reason:
+                continue
+            matched += 1
+            if matched <= offset:
+                continue
+            rows.append(record)
+            if len(rows) >= limit:
+                break
+    return rows
@@ -0,0 +1,665 @@
+import errno
+import os
+import time
+from bisect import bisect_left
+from threading import Event
+from typing import Callable, Iterator, List, Optional, Set
+
+from app.log import logger
+
+from .index import DirectoryIndex
+from .metrics import ScanStats
+from .quarantine import Quarantine
+from .report import ReportWriter, DECISION_KEPT, DECISION_REMOVED, DECISION_SKIPPED, \
+    DECISION_WOULD_REMOVE, REASON_CHANGED, REASON_EMPTY, REASON_ERROR, REASON_EXCLUDED, REASON_GONE, \
+    REASON_MOUNT, REASON_NOT_EMPTY, REASON_PROTECTED, REASON_QUARANTINED, REASON_RECENT
+from .throttle import IoThrottle
+from .optimeout import Watchdog
+
+# 当前平台是否支持基于目录句柄的相对路径操作
+_FD_SUPPORTED = os.scandir in os.supports_fd \
+    and os.open in os.supports_dir_fd \
+    and os.rmdir in os.supports_dir_fd
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+# 子目录不跟随符号链接打开，防止遍历过程中被替换为链接
+_OPEN_CHILD_FLAGS = _OPEN_FLAGS | getattr(os, "O_NOFOLLOW", 0)
+# 列出目录时每隔多少个目录项检查一次退出事件，超大目录也能及时中断
+_STOP_CHECK_MASK = 1023
+
+
+class _DirFrame:
+    """
+    遍历栈中的目录节点，保存子目录列表与子目录的判定结果
+    """
+    __slots__ = ("path", "fd", "subdirs", "index", "has_content", "children_empty", "children_gone",
+                 "mtime_ns", "cached_empty", "dev", "failed", "list_ms", "interrupted", "quarantined")
+
+    def __init__(self, path: str):
+        self.path = path
+        # 目录句柄，平台不支持时为None
+        self.fd: Optional[int] = None
+        # 待处理的子目录
+        self.subdirs: List[str] = []
+        self.index = 0
+        # 是否包含文件（或无法判定的内容）
+        self.has_content = False
+        # 子目录是否全部判定为空
+        self.children_empty = True
+        # 子目录是否已全部被删除
+        self.children_gone = True
+        # 列出时的目录修改时间，未成功列出时为None
+        self.mtime_ns: Optional[int] = None
+        # 复用索引时上次的判定结果，重新列出时为None
+        self.cached_empty: Optional[bool] = None
+        # 遍历起点所在的设备号，只在按设备号判定文件系统边界时使用
+        self.dev: Optional[int] = None
+        # 列出失败
+        self.failed = False
+        # 列出耗时（毫秒）
+        self.list_ms: Optional[float] = None
+        # 列出过程中收到退出事件，内容不完整
+        self.interrupted = False
+        # 处于隔离期或列出超时，未访问
+        self.quarantined = False
+
+
+class WalkCursor:
+    """
+    遍历断点，子目录按名称排序遍历，断点之前的目录视为已完成
+    """
+
+    def __init__(self, resume_from: Optional[str] = None):
+        """
+        :param resume_from: 从该目录继续遍历，为空时从头开始
+        """
+        self.resume_from = resume_from
+        # 中断时下一个待进入的目录，遍历完成时为None
+        self.stopped_at: Optional[str] = None
+
+
+class EmptyFolderScanner:
+    """
+    单次遍历的空文件夹扫描引擎
+    每个目录只通过 os.scandir 列出一次，自底向上将子目录的判定结果汇总给父目录
+    支持时通过目录句柄相对打开、列出与删除，删除只使用 rmdir，遍历期间写入的新内容不会被误删
+    """
+
+    def __init__(self,
+                 recursive: bool = True,
+                 dry_run: bool = False,
+                 is_excluded: Optional[Callable[[str, str], bool]] = None,
+                 stop_event: Optional[Event] = None,
+                 index: Optional[DirectoryIndex] = None,
+                 deadline: Optional[float] = None,
+                 boundaries: Optional[Set[str]] = None,
+                 check_device: bool = False,
+                 min_age: float = 0,
+                 protected: Optional[Set[str]] = None,
+                 watchdog: Optional[Watchdog] = None,
+                 quarantine: Optional[Quarantine] = None,
+                 report: Optional[ReportWriter] = None,
+                 on_remove: Optional[Callable[[str], None]] = None):
+        """
+        :param recursive: 递归模式，只包含空文件夹的目录也视为空
+        :param dry_run: 模拟运行，子目录不会真正消失
+        :param is_excluded: 排除判断，参数为(路径, 目录名)，返回True的目录及其子目录均跳过，且视为非空
+        :param stop_event: 退出事件
+        :param index: 目录索引，提供时修改时间未变化的目录直接复用上次的列出结果
+        :param deadline: 运行截止时间（time.monotonic），到达后在下一个目录前停止
+        :param boundaries: 不进入的挂载点，与排除目录一样视为非空
+        :param check_device: 无法读取挂载表时，逐个比较子目录与遍历起点的设备号，不进入其它文件系统
+        :param min_age: 最短保留时间（秒），修改时间在此之内的空文件夹暂不删除
+        :param protected: 不删除的目录，如被其它清理目录包含的清理目录，为空时视为非空
+        :param watchdog: 提供时列出目录在其工作线程中执行，超时的目录视为非空
+        :param quarantine: 隔离列表，隔离期内的目录不访问，列出超时的目录加入隔离
+        :param report: 运行报告，提供时逐个目录的结果写入报告，日志只保留汇总
+        :param on_remove: 删除目录前的回调，参数为目录路径，用于目录监控忽略插件自身的删除
+        """
+        self._recursive = recursive
+        self._dry_run = dry_run
+        self._is_excluded = is_excluded
+        self._stop_event = stop_event
+        self._index = index
+        self._deadline = deadline
+        self._boundaries = boundaries or set()
+        self._check_device = check_device
+        self._min_age_ns = int(min_age * 1_000_000_000) if min_age > 0 else 0
+        # 修改时间晚于该时间的目录视为仍在使用
+        self._age_cutoff_ns = time.time_ns() - self._min_age_ns
+        self._protected = protected or set()
+        self._watchdog = watchdog
+        self._quarantine = quarantine
+        self._report = report
+        self._on_remove = on_remove
+        # 写入报告时逐个目录的日志降为调试级别
+        self._log_folder = logger.debug if report else logger.info
+
+    @property
+    def timed_out(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def should_stop(self) -> bool:
+        """
+        收到退出事件或到达运行截止时间
+        """
+        if self._stop_event and self._stop_event.is_set():
+            return True
+        return self.timed_out
+
+    @staticmethod
+    def __open(frame: _DirFrame, parent: Optional[_DirFrame] = None):
+        """
+        打开目录句柄，有父目录句柄时相对父目录打开
+        """
+        if not _FD_SUPPORTED:
+            return
+        if parent is not None and parent.fd is not None:
+            frame.fd = os.open(os.path.basename(frame.path), _OPEN_CHILD_FLAGS, dir_fd=parent.fd)
+        else:
+            frame.fd = os.open(frame.path, _OPEN_FLAGS)
+
+    @staticmethod
+    def __close(frame: _DirFrame):
+        if frame.fd is not None:
+            os.close(frame.fd)
+            frame.fd = None
+
+    def __list_dir(self, frame: _DirFrame, stats: ScanStats, parent: Optional[_DirFrame] = None,
+                   throttle: Optional[IoThrottle] = None):
+        """
+        打开并列出目录内容，只收集子目录，遇到第一个文件后不再判定其余非目录项
+        排除目录在此处剪枝，不会进入遍历
+        """
+        if self._quarantine and self._quarantine.blocked(frame.path):
+            logger.debug(f"跳过隔离目录：{frame.path}")
+            stats.dirs_quarantined += 1
+            self.__skip_quarantined(frame)
+            return
+        if throttle is None:
+            self.__run_list_dir(frame, stats, parent)
+            return
+        with throttle.listing() as waited:
+            stats.throttle_seconds += waited
+            self.__run_list_dir(frame, stats, parent)
+
+    @staticmethod
+    def __skip_quarantined(frame: _DirFrame):
+        frame.quarantined = True
+        frame.has_content = True
+        frame.mtime_ns = None
+
+    def __run_list_dir(self, frame: _DirFrame, stats: ScanStats, parent: Optional[_DirFrame] = None):
+        if self._watchdog is None:
+            self.__do_list_dir(frame, stats, parent)
+        else:
+            self.__watched_list_dir(frame, stats, parent)
+        if self._quarantine and not frame.failed:
+            self._quarantine.release(frame.path)
+
+    def __watched_list_dir(self, frame: _DirFrame, stats: ScanStats, parent: Optional[_DirFrame] = None):
+        """
+        在看门狗线程中列出目录，结果写入临时节点，超时后被放弃的操作不会再修改遍历状态
+        """
+        scratch = _DirFrame(frame.path)
+        scratch.dev = frame.dev
+        scratch_stats = ScanStats()
+        try:
+            self._watchdog.run(self.__do_list_dir, scratch, scratch_stats, parent,
+                               path=frame.path, on_abandon=lambda: self.__close(scratch))
+        except TimeoutError as e:
+            logger.warning(f"列出文件夹 {frame.path} 超时：{str(e)}")
+            stats.dirs_visited += 1
+            stats.errors += 1
+            stats.dirs_quarantined += 1
+            if self._quarantine is not None:
+                self._quarantine.add(frame.path)
+            self.__skip_quarantined(frame)
+            frame.failed = True
+            frame.list_ms = self._watchdog.timeout * 1000
+            return
+        stats.merge(scratch_stats)
+        for name in _DirFrame.__slots__:
+            setattr(frame, name, getattr(scratch, name))
+
+    def __guarded(self, func: Callable, *args, path: str, on_abandon: Optional[Callable[[], None]] = None):
+        """
+        提供看门狗时在其工作线程中执行文件系统操作，超时的目录加入隔离并抛出 TimeoutError
+        """
+        if self._watchdog is None:
+            return func(*args)
+        try:
+            return self._watchdog.run(func, *args, path=path, on_abandon=on_abandon)
+        except TimeoutError as e:
+            logger.warning(f"访问文件夹 {path} 超时：{str(e)}")
+            if self._quarantine is not None:
+                self._quarantine.add(path)
+            raise
+
+    def __do_list_dir(self, frame: _DirFrame, stats: ScanStats, parent: Optional[_DirFrame] = None):
+        start = time.perf_counter()
+        stats.dirs_visited += 1
+        try:
+            self.__open(frame, parent)
+            # 增量索引与设备号需要在列出前 stat，最短保留时间也复用这次结果，有目录句柄时使用 fstat
+            if self._index is not None or (self._check_device and frame.dev is None):
+                self.__stat(frame)
+            if self._index is not None:
+                cached = self._index.get(frame.path, frame.mtime_ns)
+                if cached is not None:
+                    frame.has_content, frame.cached_empty, frame.subdirs = cached
+                    stats.dirs_cached += 1
+                    return
+            with os.scandir(frame.fd if frame.fd is not None else frame.path) as it:
+                for entry in it:
+                    stats.entries_listed += 1
+                    if not stats.entries_listed & _STOP_CHECK_MASK and self.should_stop():
+                        frame.interrupted = True
+                        break
+                    # 符号链接不跟随，视为目录内容
+                    if entry.is_dir(follow_symlinks=False):
+                        child_path = os.path.join(frame.path, entry.name)
+                        if self._is_excluded and self._is_excluded(child_path, entry.name):
+                            logger.debug(f"跳过排除目录：{child_path}")
+                            stats.dirs_excluded += 1
+                            if self._report:
+                                self._report.write(child_path, DECISION_KEPT, REASON_EXCLUDED)
+                            # 排除目录不会被删除，父目录也不能视为空
+                            frame.has_content = True
+                            continue
+                        if self.__is_boundary(child_path, entry, frame):
+                            logger.debug(f"跳过挂载点：{child_path}")
+                            stats.dirs_excluded += 1
+                            if self._report:
+                                self._report.write(child_path, DECISION_KEPT, REASON_MOUNT)
+                            frame.has_content = True
+                            continue
+                        frame.subdirs.append(child_path)
+                    elif not frame.has_content:
+                        frame.has_content = True
+            if frame.interrupted:
+                # 未列完的目录不做判定，也不写入索引
+                frame.has_content = True
+                frame.subdirs.clear()
+                frame.mtime_ns = None
+                return
+            # 最短保留时间只需判断可能为空的目录，在删除子目录之前读取修改时间
+            if self._min_age_ns and frame.mtime_ns is None and not frame.has_content:
+                self.__stat(frame)
+            # 按名称排序，保证遍历顺序稳定，断点可以续扫
+            frame.subdirs.sort()
+        except OSError as e:
+            logger.warning(f"检查文件夹 {frame.path} 时出错：{str(e)}")
+            stats.errors += 1
+            frame.failed = True
+            frame.has_content = True
+            frame.subdirs.clear()
+            # 列出失败的目录不写入索引
+            frame.mtime_ns = None
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.list_seconds += elapsed
+            frame.list_ms = elapsed * 1000
+
+    def __stat(self, frame: _DirFrame):
+        stat = os.fstat(frame.fd) if frame.fd is not None else os.stat(frame.path)
+        frame.mtime_ns = stat.st_mtime_ns
+        if self._check_device and frame.dev is None:
+            frame.dev = stat.st_dev
+
+    def __is_boundary(self, child_path: str, entry: os.DirEntry, frame: _DirFrame) -> bool:
+        """
+        子目录是挂载点或位于其它文件系统
+        """
+        if child_path in self._boundaries:
+            return True
+        if self._check_device and frame.dev is not None:
+            return entry.stat(follow_symlinks=False).st_dev != frame.dev
+        return False
+
+    def __record(self, frame: _DirFrame, empty: bool, removed: bool, recent: bool = False):
+        """
+        将目录的列出结果与判定结果写入索引
+        :param recent: 因修改时间过新而保留的空文件夹，标记为下次重新列出
+        """
+        if self._index is None or frame.mtime_ns is None:
+            return
+        if removed and not self._dry_run:
+            self._index.discard(frame.path)
+        elif recent:
+            self._index.put(frame.path, -1, frame.has_content, empty, frame.subdirs)
+        elif frame.cached_empty is None:
+            self._index.put(frame.path, frame.mtime_ns, frame.has_content, empty, frame.subdirs)
+        elif frame.cached_empty != empty:
+            self._index.update_verdict(frame.path, empty)
+
+    def __report(self, frame: _DirFrame, removed: bool, recent: bool, kept: bool):
+        """
+        将目录的判定结果写入报告
+        """
+        if removed:
+            decision, reason = DECISION_WOULD_REMOVE if self._dry_run else DECISION_REMOVED, REASON_EMPTY
+        elif recent:
+            decision, reason = DECISION_KEPT, REASON_RECENT
+        elif kept:
+            decision, reason = DECISION_KEPT, REASON_PROTECTED
+        elif frame.quarantined:
+            decision, reason = DECISION_KEPT, REASON_QUARANTINED
+        else:
+            decision, reason = DECISION_KEPT, REASON_ERROR if frame.failed else REASON_NOT_EMPTY
+        self._report.write(frame.path, decision, reason, frame.list_ms)
+
+    def __is_recent(self, frame: _DirFrame) -> bool:
+        """
+        目录修改时间在最短保留时间之内，可能即将写入内容
+        """
+        return bool(self._min_age_ns) and frame.mtime_ns is not None and frame.mtime_ns > self._age_cutoff_ns
+
+    def __is_empty(self, frame: _DirFrame) -> bool:
+        """
+        根据目录自身内容与子目录判定结果得出目录是否为空
+        """
+        if frame.has_content:
+            return False
+        if not frame.subdirs:
+            return True
+        if self._recursive and self._dry_run:
+            return frame.children_empty
+        # 实际删除时只有子目录已经全部删除，rmdir 才能成功
+        return frame.children_gone
+
+    def __remove(self, frame: _DirFrame, parent: _DirFrame, stats: ScanStats,
+                 throttle: Optional[IoThrottle] = None) -> bool:
+        """
+        删除已判定为空的文件夹，只使用 rmdir，目录非空时视为竞争失败并跳过
+        """
+        if self._dry_run:
+            self._log_folder(f"[模拟] 将删除空文件夹：{frame.path}")
+            return True
+        if throttle is None:
+            return self.__do_remove(frame, parent, stats)
+        with throttle.operation() as waited:
+            stats.throttle_seconds += waited
+            return self.__do_remove(frame, parent, stats)
+
+    def __do_remove(self, frame: _DirFrame, parent: _DirFrame, stats: ScanStats) -> bool:
+        start = time.perf_counter()
+        if self._on_remove:
+            # 先于删除登记，删除事件到达监控时已能识别
+            self._on_remove(frame.path)
+        try:
+            if parent.fd is not None:
+                os.rmdir(os.path.basename(frame.path), dir_fd=parent.fd)
+            else:
+                os.rmdir(frame.path)
+            self._log_folder(f"删除空文件夹：{frame.path}")
+            return True
+        except OSError as e:
+            if e.errno in (errno.ENOTEMPTY, errno.EEXIST):
+                self._log_folder(f"文件夹 {frame.path} 在检查后写入了新内容，跳过删除")
+                stats.skipped += 1
+                decision, reason = DECISION_SKIPPED, REASON_CHANGED
+            elif e.errno == errno.ENOENT:
+                logger.debug(f"文件夹 {frame.path} 已不存在")
+                decision, reason = DECISION_SKIPPED, REASON_GONE
+            else:
+                logger.error(f"删除文件夹 {frame.path} 失败：{str(e)}")
+                stats.errors += 1
+                decision, reason = DECISION_KEPT, REASON_ERROR
+            if self._report:
+                self._report.write(frame.path, decision, reason, frame.list_ms)
+            return False
+        finally:
+            stats.delete_seconds += time.perf_counter() - start
+
+    def list_subdirs(self, path: str, throttle: Optional[IoThrottle] = None,
+                     stats: Optional[ScanStats] = None) -> List[str]:
+        """
+        列出根目录下未被排除的直接子目录，用于拆分并发任务
+        列出结果写入索引，根目录本身不会被删除，判定结果只依据其直接内容
+        :param stats: 性能统计，计入根目录本身的列出
+        """
+        stats = stats if stats is not None else ScanStats()
+        start = time.perf_counter()
+        frame = _DirFrame(path)
+        try:
+            self.__list_dir(frame, stats, throttle=throttle)
+            self.__close(frame)
+            self.__record(frame, not frame.has_content and not frame.subdirs, False)
+        finally:
+            stats.total_seconds += time.perf_counter() - start
+        return frame.subdirs
+
+    def iter_scan(self, root: str, cursor: Optional[WalkCursor] = None,
+                  stats: Optional[ScanStats] = None, throttle: Optional[IoThrottle] = None) -> Iterator[str]:
+        """
+        自底向上扫描并删除空文件夹，根目录本身不会被删除
+        每删除一个文件夹即产出其路径，内存占用只与目录深度相关
+        :param cursor: 遍历断点，中断时记录续扫位置
+        :param stats: 性能统计，遍历过程中累加
+        :param throttle: I/O 限速
+        """
+        stats = stats if stats is not None else ScanStats()
+        start = time.perf_counter()
+        try:
+            root_frame = _DirFrame(root)
+            self.__list_dir(root_frame, stats, throttle=throttle)
+            if root_frame.interrupted:
+                self.__close(root_frame)
+                if cursor:
+                    cursor.stopped_at = root
+                return
+            self.__seek(root_frame, cursor)
+            yield from self.__walk(root_frame, stats, cursor, throttle)
+        finally:
+            stats.total_seconds += time.perf_counter() - start
+
+    def iter_subtree(self, path: str, cursor: Optional[WalkCursor] = None,
+                     stats: Optional[ScanStats] = None, throttle: Optional[IoThrottle] = None) -> Iterator[str]:
+        """
+        扫描子树并删除空文件夹，子树根目录为空时同样会被删除
+        每删除一个文件夹即产出其路径
+        :param cursor: 遍历断点，中断时记录续扫位置
+        :param stats: 性能统计，遍历过程中累加
+        :param throttle: I/O 限速
+        """
+        stats = stats if stats is not None else ScanStats()
+        start = time.perf_counter()
+        try:
+            # 以父目录作为虚拟节点承接子树根目录的判定结果
+            top_frame = _DirFrame(os.path.dirname(path))
+            top_frame.subdirs.append(path)
+            if self._quarantine and self._quarantine.covers(path):
+                logger.debug(f"跳过隔离目录：{path}")
+                stats.dirs_quarantined += 1
+                return
+            try:
+                self.__guarded(self.__open_top, top_frame, path=top_frame.path,
+                               on_abandon=lambda: self.__close(top_frame))
+            except OSError as e:
+                logger.warning(f"检查文件夹 {path} 时出错：{str(e)}")
+                stats.errors += 1
+                return
+            yield from self.__walk(top_frame, stats, cursor, throttle)
+        finally:
+            stats.total_seconds += time.perf_counter() - start
+
+    def scan(self, root: str, cursor: Optional[WalkCursor] = None, stats: Optional[ScanStats] = None,
+             throttle: Optional[IoThrottle] = None) -> int:
+        """
+        扫描根目录，返回删除数量
+        """
+        return sum(1 for _ in self.iter_scan(root, cursor, stats, throttle))
+
+    def scan_subtree(self, path: str, cursor: Optional[WalkCursor] = None,
+                     stats: Optional[ScanStats] = None, throttle: Optional[IoThrottle] = None) -> int:
+        """
+        扫描子树，返回删除数量
+        """
+        return sum(1 for _ in self.iter_subtree(path, cursor, stats, throttle))
+
+    def __open_top(self, frame: _DirFrame):
+        self.__open(frame)
+        if self._check_device:
+            frame.dev = (os.fstat(frame.fd) if frame.fd is not None else os.stat(frame.path)).st_dev
+
+    def __has_direct_content(self, path: str) -> bool:
+        """
+        检查目录是否直接包含文件或排除目录，遇到第一个即停止列出
+        """
+        try:
+            return self.__guarded(self.__scan_direct_content, path, path=path)
+        except OSError as e:
+            logger.warning(f"检查文件夹 {path} 时出错：{str(e)}")
+            return True
+
+    def __scan_direct_content(self, path: str) -> bool:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    return True
+                if self._is_excluded and self._is_excluded(entry.path, entry.name):
+                    return True
+                if entry.path in self._boundaries:
+                    return True
+        return False
+
+    def is_excluded_path(self, path: str, root: str) -> bool:
+        """
+        path 本身或其位于 root 之下的任一父目录被排除，或是不进入的挂载点
+        """
+        if not self._is_excluded and not self._boundaries:
+            return False
+        root_prefix = root.rstrip(os.sep) + os.sep
+        while path.startswith(root_prefix):
+            if path in self._boundaries:
+                return True
+            if self._is_excluded and self._is_excluded(path, os.path.basename(path)):
+                return True
+            path = os.path.dirname(path)
+        return False
+
+    def clean_ancestors(self, path: str, root: str, visited: Set[str], stats: Optional[ScanStats] = None,
+                        throttle: Optional[IoThrottle] = None) -> int:
+        """
+        从 path 开始沿父目录链向上检查并删除空文件夹，遇到非空目录或到达根目录时停止
+        :param path: 受影响的目录
+        :param root: 所属的清理根目录，不会被删除
+        :param visited: 本批次已检查过的目录，多条父目录链在此汇合时不再重复检查
+        :param stats: 性能统计
+        :param throttle: I/O 限速
+        返回: 删除数量
+        """
+        root_prefix = root.rstrip(os.sep) + os.sep
+        if not path.startswith(root_prefix):
+            return 0
+
+        # 位于排除目录之下的路径在全量扫描中也不会进入，直接跳过
+        if self.is_excluded_path(path, root):
+            return 0
+        # 位于隔离目录之下的路径可能同样会阻塞
+        if self._quarantine and self._quarantine.covers(path):
+            return 0
+
+        # 模拟运行时目录不会真正消失，父目录会再次判定到已删除的子目录，需去重
+        removed_folders = set()
+        while path.startswith(root_prefix) and path not in visited:
+            if self.should_stop():
+                break
+            visited.add(path)
+            try:
+                exists = self.__guarded(os.path.lexists, path, path=path)
+            except TimeoutError:
+                break
+            if not exists:
+                # 目录已随移动或删除消失，继续检查父目录
+                path = os.path.dirname(path)
+                continue
+            if self.__has_direct_content(path):
+                break
+            removed_folders.update(self.iter_subtree(path, stats=stats, throttle=throttle))
+            if path not in removed_folders:
+                break
+            path = os.path.dirname(path)
+
+        return len(removed_folders)
+
+    @staticmethod
+    def __seek(frame: _DirFrame, cursor: Optional[WalkCursor]):
+        """
+        位于断点路径上的目录跳过断点之前的子目录
+        """
+        if not cursor or not cursor.resume_from:
+            return
+        prefix = os.path.join(frame.path, "")
+        if not cursor.resume_from.startswith(prefix):
+            return
+        name = cursor.resume_from[len(prefix):].split(os.sep, 1)[0]
+        frame.index = bisect_left(frame.subdirs, prefix + name)
+        if frame.index:
+            # 之前的子目录上次未被删除，当前目录不能视为空
+            frame.children_empty = False
+            frame.children_gone = False
+
+    def __walk(self, top_frame: _DirFrame, stats: ScanStats, cursor: Optional[WalkCursor] = None,
+               throttle: Optional[IoThrottle] = None) -> Iterator[str]:
+        """
+        从已列出内容的顶层节点开始做后序遍历，顶层节点本身不做判定
+        目录的子目录全部处理完成后立即判定并产出删除结果，栈中只保留当前路径上的节点
+        """
+        stack = [top_frame]
+
+        try:
+            while stack:
+                frame = stack[-1]
+                # 还有未处理的子目录，先深入子目录
+                if frame.index < len(frame.subdirs):
+                    if self.should_stop():
+                        if cursor:
+                            cursor.stopped_at = frame.subdirs[frame.index]
+                        break
+                    child = _DirFrame(frame.subdirs[frame.index])
+                    child.dev = frame.dev
+                    frame.index += 1
+                    self.__list_dir(child, stats, frame, throttle)
+                    if child.interrupted:
+                        # 下次从该目录重新开始
+                        self.__close(child)
+                        if cursor:
+                            cursor.stopped_at = child.path
+                        break
+                    self.__seek(child, cursor)
+                    stack.append(child)
+                    continue
+
+                # 子目录已全部处理完成，得出当前目录的判定结果
+                stack.pop()
+                self.__close(frame)
+                empty = self.__is_empty(frame)
+                if not stack:
+                    self.__record(frame, empty, False)
+                    break
+                parent = stack[-1]
+
+                recent = empty and self.__is_recent(frame)
+                if recent:
+                    logger.debug(f"文件夹 {frame.path} 修改时间过新，暂不删除")
+                    stats.recent += 1
+                # 保留时间之内与受保护的空文件夹都保留，下次重新检查
+                kept = recent or (empty and frame.path in self._protected)
+                removed = empty and not kept and self.__remove(frame, parent, stats, throttle)
+                self.__record(frame, empty, removed, kept)
+                # 删除失败的目录已在删除时写入报告
+                if self._report and (removed or kept or not empty):
+                    self.__report(frame, removed, recent, kept)
+
+                if not empty or kept:
+                    parent.children_empty = False
+                if not removed or self._dry_run:
+                    parent.children_gone = False
+                if removed:
+                    stats.removed += 1
+                    yield frame.path
+        finally:
+            # 中途退出时关闭仍打开的目录句柄
+            for frame in stack:
+                self.__close(frame)
@@ -0,0 +1,454 @@
+import errno
+import os
+import posixpath
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from app.log import logger
+
+from .metrics import ScanStats
+from .report import ReportWriter, DECISION_KEPT, DECISION_REMOVED, DECISION_SKIPPED, DECISION_WOULD_REMOVE, \
+    REASON_CHANGED, REASON_EMPTY, REASON_ERROR, REASON_EXCLUDED, REASON_GONE, REASON_NOT_EMPTY, \
+    REASON_PROTECTED
+
+# 本地存储名称
+LOCAL_STORAGE = "local"
+# 存储目录写法：存储名:/路径，存储名至少两个字符，不与 Windows 盘符混淆
+_STORAGE_ROOT_RE = re.compile(r"^([A-Za-z][\w-]+):(/.*)$")
+# 默认的并发连接数
+_DEFAULT_WORKERS = 4
+# 单次批量删除的目录数
+_DELETE_BATCH = 100
+
+
+def parse_storage_root(text: str) -> Tuple[str, str]:
+    """
+    解析清理目录，未指定存储时为本地目录
+    返回: (存储名, 路径)
+    """
+    text = text.strip()
+    match = _STORAGE_ROOT_RE.match(text)
+    if not match or match.group(1).lower() == LOCAL_STORAGE:
+        return LOCAL_STORAGE, match.group(2) if match else text
+    return match.group(1), posixpath.normpath(match.group(2))
+
+
+class StorageEntry(NamedTuple):
+    """
+    目录项
+    """
+    name: str
+    path: str
+    is_dir: bool
+
+
+class StorageBackend:
+    """
+    存储后端
+    批量列出与删除通过连接池并发执行，每个目录只列出一次，不缓存列出结果；
+    子类实现 _list_dir 与 _remove_dir，失败时抛出 OSError，支持批量删除的后端可覆盖 _remove_batch
+    """
+
+    def __init__(self, name: str, workers: int = _DEFAULT_WORKERS):
+        """
+        :param name: 存储名称
+        :param workers: 并发连接数
+        """
+        self.name = name
+        self._workers = max(workers, 1)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _list_dir(self, path: str) -> List[StorageEntry]:
+        raise NotImplementedError
+
+    def _remove_dir(self, path: str):
+        """
+        删除空目录，目录非空时抛出 ENOTEMPTY，不能删除其中的内容
+        """
+        raise NotImplementedError
+
+    def _remove_batch(self, paths: List[str]) -> Dict[str, Optional[OSError]]:
+        """
+        删除一批空目录，默认通过连接池逐个删除
+        """
+        def remove(path: str) -> Optional[OSError]:
+            try:
+                self._remove_dir(path)
+                return None
+            except OSError as e:
+                return e
+
+        return dict(zip(paths, self.__map(remove, paths)))
+
+    def __map(self, func: Callable[[str], Any], paths: List[str]) -> List[Any]:
+        if len(paths) <= 1 or self._workers <= 1:
+            return [func(path) for path in paths]
+        if not self._pool:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers,
+                                            thread_name_prefix=f"EmptyFolderCleaner-{self.name}")
+        return list(self._pool.map(func, paths))
+
+    def list_dir(self, path: str) -> List[StorageEntry]:
+        return self._list_dir(path)
+
+    def forget(self, paths: List[str]):
+        """
+        已判定的目录不再访问，释放列出时保存的信息
+        """
+
+    def list_dirs(self, paths: List[str], should_stop: Optional[Callable[[], bool]] = None
+                  ) -> Dict[str, Union[List[StorageEntry], OSError]]:
+        """
+        批量列出目录，失败的目录对应其异常
+        :param should_stop: 每个目录列出前检查，返回True时剩余目录不再列出
+        """
+        def list_one(path: str) -> Union[List[StorageEntry], OSError]:
+            if should_stop and should_stop():
+                return InterruptedError(errno.EINTR, "清理已停止", path)
+            try:
+                return self.list_dir(path)
+            except OSError as e:
+                return e
+
+        return dict(zip(paths, self.__map(list_one, paths)))
+
+    def remove_dirs(self, paths: List[str]) -> Dict[str, Optional[OSError]]:
+        """
+        批量删除空目录
+        """
+        results = {}
+        for start in range(0, len(paths), _DELETE_BATCH):
+            results.update(self._remove_batch(paths[start:start + _DELETE_BATCH]))
+        return results
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+class LocalStorage(StorageBackend):
+    """
+    本地文件系统
+    """
+
+    def __init__(self, workers: int = _DEFAULT_WORKERS):
+        super().__init__(LOCAL_STORAGE, workers)
+
+    def _list_dir(self, path: str) -> List[StorageEntry]:
+        with os.scandir(path) as it:
+            return [StorageEntry(entry.name, entry.path, entry.is_dir(follow_symlinks=False)) for entry in it]
+
+    def _remove_dir(self, path: str):
+        os.rmdir(path)
+
+
+class MemoryStorage(StorageBackend):
+    """
+    内存存储，用于离线验证清理逻辑
+    支持批量删除，记录列出与删除的调用次数
+    """
+
+    def __init__(self, name: str = "memory", workers: int = _DEFAULT_WORKERS):
+        super().__init__(name, workers)
+        # 目录 -> 子项名称 -> 是否为目录
+        self._tree: Dict[str, Dict[str, bool]] = {"/": {}}
+        self._tree_lock = Lock()
+        self.list_calls = 0
+        self.delete_calls = 0
+
+    def add_dir(self, path: str):
+        path = posixpath.normpath(path)
+        with self._tree_lock:
+            # 逐级创建不存在的父目录
+            child = None
+            while path not in self._tree:
+                self._tree[path] = {posixpath.basename(child): True} if child else {}
+                child, path = path, posixpath.dirname(path)
+            if child:
+                self._tree[path][posixpath.basename(child)] = True
+
+    def add_file(self, path: str):
+        path = posixpath.normpath(path)
+        parent = posixpath.dirname(path)
+        self.add_dir(parent)
+        with self._tree_lock:
+            self._tree[parent][posixpath.basename(path)] = False
+
+    def exists(self, path: str) -> bool:
+        return posixpath.normpath(path) in self._tree
+
+    def _list_dir(self, path: str) -> List[StorageEntry]:
+        with self._tree_lock:
+            self.list_calls += 1
+            children = self._tree.get(path)
+            if children is None:
+                raise FileNotFoundError(errno.ENOENT, "目录不存在", path)
+            return [StorageEntry(name, posixpath.join(path, name), is_dir) for name, is_dir in children.items()]
+
+    def _remove_dir(self, path: str):
+        with self._tree_lock:
+            children = self._tree.get(path)
+            if children is None:
+                raise FileNotFoundError(errno.ENOENT, "目录不存在", path)
+            if children:
+                raise OSError(errno.ENOTEMPTY, "目录非空", path)
+            del self._tree[path]
+            self._tree[posixpath.dirname(path)].pop(posixpath.basename(path), None)
+
+    def _remove_batch(self, paths: List[str]) -> Dict[str, Optional[OSError]]:
+        self.delete_calls += 1
+        results = {}
+        for path in paths:
+            try:
+                self._remove_dir(path)
+                results[path] = None
+            except OSError as e:
+                results[path] = e
+        return results
+
+
+class MoviePilotStorage(StorageBackend):
+    """
+    通过 MoviePilot 存储模块访问的存储，如网盘与 Rclone、Alist 等远程存储
+    """
+
+    def __init__(self, name: str, workers: int = _DEFAULT_WORKERS):
+        super().__init__(name, workers)
+        from app.chain.storage import StorageChain
+        self._chain = StorageChain()
+        # 列出时得到的子目录项，列出与删除时无需重新查询，目录判定后释放
+        self._items: Dict[str, Any] = {}
+
+    def __item(self, path: str) -> Any:
+        item = self._items.get(path)
+        if item is None:
+            item = self._chain.get_file_item(storage=self.name, path=Path(path))
+            if not item:
+                raise FileNotFoundError(errno.ENOENT, "目录不存在", path)
+        return item
+
+    def _list_dir(self, path: str) -> List[StorageEntry]:
+        files = self._chain.list_files(self.__item(path))
+        if files is None:
+            raise OSError(errno.EIO, "列出目录失败", path)
+        entries = []
+        for file in files:
+            child = posixpath.join(path, file.name)
+            if file.type == "dir":
+                self._items[child] = file
+            entries.append(StorageEntry(file.name, child, file.type == "dir"))
+        return entries
+
+    def _remove_dir(self, path: str):
+        item = self.__item(path)
+        # 存储模块删除目录时会连同内容一起删除，删除前重新确认目录为空，无法确认时不删除
+        files = self._chain.list_files(item)
+        if files is None:
+            raise OSError(errno.EIO, "删除前列出目录失败", path)
+        if files:
+            raise OSError(errno.ENOTEMPTY, "目录非空", path)
+        if not self._chain.delete_file(item):
+            raise OSError(errno.EIO, "删除失败", path)
+
+    def forget(self, paths: List[str]):
+        for path in paths:
+            self._items.pop(path, None)
+
+
+def open_storage(name: str, workers: int = _DEFAULT_WORKERS) -> StorageBackend:
+    """
+    按存储名称创建存储后端
+    """
+    if name == LOCAL_STORAGE:
+        return LocalStorage(workers)
+    return MoviePilotStorage(name, workers)
+
+
+class _Node:
+    """
+    待判定的目录，只引用父目录；子目录判定后把结果计入父目录，判定完的一层即可释放
+    """
+    __slots__ = ("path", "parent", "subdirs", "empty_subdirs", "removed_subdirs", "has_content", "failed",
+                 "empty", "removed")
+
+    def __init__(self, path: str, parent: Optional["_Node"] = None):
+        self.path = path
+        self.parent = parent
+        # 子目录数，及其中判定为空、已删除的数量
+        self.subdirs = 0
+        self.empty_subdirs = 0
+        self.removed_subdirs = 0
+        self.has_content = False
+        self.failed = False
+        self.empty = False
+        self.removed = False
+
+
+class StorageScanner:
+    """
+    基于存储后端的空文件夹清理
+    按层批量列出目录，再自底向上判定并按层批量删除，适合单次调用延迟较高的远程存储
+    """
+
+    def __init__(self,
+                 backend: StorageBackend,
+                 recursive: bool = True,
+                 dry_run: bool = False,
+                 is_excluded: Optional[Callable[[str, str], bool]] = None,
+                 stop_event: Optional[Event] = None,
+                 protected: Optional[Set[str]] = None,
+                 report: Optional[ReportWriter] = None):
+        """
+        :param backend: 存储后端
+        :param recursive: 递归模式，只包含空文件夹的目录也视为空
+        :param dry_run: 模拟运行，只记录不删除
+        :param is_excluded: 排除判断，参数为(路径, 目录名)
+        :param stop_event: 退出事件，每批操作之间检查
+        :param protected: 不删除的目录，为空时视为非空
+        :param report: 运行报告
+        """
+        self._backend = backend
+        self._recursive = recursive
+        self._dry_run = dry_run
+        self._is_excluded = is_excluded
+        self._stop_event = stop_event
+        self._protected = protected or set()
+        self._report = report
+        self._log_folder = logger.debug if report else logger.info
+
+    def __stopped(self) -> bool:
+        return bool(self._stop_event and self._stop_event.is_set())
+
+    def __list_levels(self, root: _Node, stats: ScanStats) -> List[List[_Node]]:
+        """
+        逐层批量列出目录，只保留子目录，文件只记为目录非空
+        """
+        levels = []
+        level = [root]
+        while level and not self.__stopped():
+            levels.append(level)
+            start = time.perf_counter()
+            listings = self._backend.list_dirs([node.path for node in level], self.__stopped)
+            stats.list_seconds += time.perf_counter() - start
+            next_level = []
+            for node in level:
+                stats.dirs_visited += 1
+                # 列出结果处理后即释放
+                entries = listings.pop(node.path)
+                if isinstance(entries, InterruptedError):
+                    node.failed = node.has_content = True
+                    continue
+                if isinstance(entries, OSError):
+                    logger.warning(f"检查文件夹 {node.path} 时出错：{str(entries)}")
+                    stats.errors += 1
+                    node.failed = node.has_content = True
+                    continue
+                stats.entries_listed += len(entries)
+                for entry in entries:
+                    if not entry.is_dir:
+                        node.has_content = True
+                    elif self._is_excluded and self._is_excluded(entry.path, entry.name):
+                        stats.dirs_excluded += 1
+                        node.has_content = True
+                        if self._report:
+                            self._report.write(entry.path, DECISION_KEPT, REASON_EXCLUDED)
+                    else:
+                        node.subdirs += 1
+                        next_level.append(_Node(entry.path, node))
+            level = next_level
+        return levels
+
+    def __is_empty(self, node: _Node) -> bool:
+        if node.has_content or node.path in self._protected:
+            return False
+        if not node.subdirs:
+            return True
+        if self._dry_run:
+            return self._recursive and node.empty_subdirs == node.subdirs
+        # 实际删除时只有子目录已经全部删除，父目录才能删除
+        return node.removed_subdirs == node.subdirs
+
+    def __remove_level(self, nodes: List[_Node], stats: ScanStats):
+        """
+        批量删除同一层已判定为空的目录
+        """
+        if self._dry_run:
+            for node in nodes:
+                node.removed = True
+                self._log_folder(f"[模拟] 将删除空文件夹：{node.path}")
+            return
+        start = time.perf_counter()
+        results = self._backend.remove_dirs([node.path for node in nodes])
+        stats.delete_seconds += time.perf_counter() - start
+        for node in nodes:
+            error = results.get(node.path)
+            if error is None:
+                node.removed = True
+                self._log_folder(f"删除空文件夹：{node.path}")
+                continue
+            if error.errno in (errno.ENOTEMPTY, errno.EEXIST):
+                self._log_folder(f"文件夹 {node.path} 在检查后写入了新内容，跳过删除")
+                stats.skipped += 1
+                decision, reason = DECISION_SKIPPED, REASON_CHANGED
+            elif error.errno == errno.ENOENT:
+                logger.debug(f"文件夹 {node.path} 已不存在")
+                decision, reason = DECISION_SKIPPED, REASON_GONE
+            else:
+                logger.error(f"删除文件夹 {node.path} 失败：{str(error)}")
+                stats.errors += 1
+                decision, reason = DECISION_KEPT, REASON_ERROR
+            if self._report:
+                self._report.write(node.path, decision, reason)
+
+    def iter_scan(self, root: str, stats: Optional[ScanStats] = None) -> Iterator[str]:
+        """
+        清理存储上的目录，根目录本身不删除
+        返回: 删除（模拟运行时为将删除）的文件夹路径
+        """
+        if stats is None:
+            stats = ScanStats()
+        start = time.perf_counter()
+        try:
+            levels = self.__list_levels(_Node(root), stats)
+            # 列出被中断时子目录信息不完整，不做任何删除
+            if self.__stopped():
+                return
+            # 自深向浅逐层判定，同层的空目录一次批量删除，判定完的一层随即释放
+            while len(levels) > 1:
+                if self.__stopped():
+                    return
+                level = levels.pop()
+                candidates = []
+                for node in level:
+                    node.empty = self.__is_empty(node)
+                    if node.empty:
+                        candidates.append(node)
+                    elif self._report:
+                        if node.failed:
+                            reason = REASON_ERROR
+                        elif node.path in self._protected:
+                            reason = REASON_PROTECTED
+                        else:
+                            reason = REASON_NOT_EMPTY
+                        self._report.write(node.path, DECISION_KEPT, reason)
+                if candidates:
+                    self.__remove_level(candidates, stats)
+                for node in level:
+                    node.parent.empty_subdirs += node.empty
+                    node.parent.removed_subdirs += node.removed
+                self._backend.forget([node.path for node in level])
+                for node in candidates:
+                    if node.removed:
+                        stats.removed += 1
+                        if self._report:
+                            self._report.write(node.path,
+                                               DECISION_WOULD_REMOVE if self._dry_run else DECISION_REMOVED,
+                                               REASON_EMPTY)
+                        yield node.path
+        finally:
+            stats.total_seconds += time.perf_counter() - start
@@ -0,0 +1,144 @@
+import os
+import time
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Event, Lock
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.log import logger
+
+# 延迟平滑系数
+_LATENCY_ALPHA = 0.2
+# 平滑延迟超过基线的倍数时退避，低于该倍数的一半时逐步恢复
+_BACKOFF_RATIO = 3.0
+# 自适应退避的操作间隔范围（秒）
+_MIN_BACKOFF_INTERVAL = 0.005
+_MAX_BACKOFF_INTERVAL = 0.5
+# 计算基线前需要的样本数
+_BASELINE_SAMPLES = 20
+
+
+class IoThrottle:
+    """
+    单个清理目录的 I/O 限速
+    限制每秒列出目录数与同时进行的文件系统操作数，可根据列出延迟自动退避
+    同一清理目录的并发任务共用一个实例
+    """
+
+    def __init__(self, rate: float = 0, concurrency: int = 0, adaptive: bool = False,
+                 stop_event: Optional[Event] = None):
+        """
+        :param rate: 每秒列出目录数上限，0为不限制
+        :param concurrency: 同时进行的文件系统操作数上限，0为不限制
+        :param adaptive: 列出延迟明显升高时自动降低速率
+        :param stop_event: 退出事件，等待期间收到时立即返回
+        """
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._semaphore = BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self._adaptive = adaptive
+        self._stop_event = stop_event
+        self._lock = Lock()
+        # 下一次允许列出的时间（time.monotonic）
+        self._next_time = 0.0
+        # 自适应退避状态
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._samples = 0
+        self._backoff = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._interval or self._semaphore or self._adaptive)
+
+    def __wait(self, seconds: float):
+        if seconds <= 0:
+            return
+        if self._stop_event:
+            self._stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def __observe(self, latency: float):
+        """
+        记录一次列出耗时，更新退避间隔
+        """
+        with self._lock:
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += _LATENCY_ALPHA * (latency - self._latency)
+            self._samples += 1
+            if self._samples < _BASELINE_SAMPLES:
+                return
+            # 基线取平滑延迟的最低值，存储空闲时的响应速度
+            if self._baseline is None or self._latency < self._baseline:
+                self._baseline = self._latency
+            if self._latency > self._baseline * _BACKOFF_RATIO:
+                backoff = min(max(self._backoff * 2, _MIN_BACKOFF_INTERVAL), _MAX_BACKOFF_INTERVAL)
+                if backoff != self._backoff:
+                    logger.debug(f"目录列出延迟升高（{self._latency * 1000:.1f}ms），"
+                                 f"操作间隔调整为 {backoff * 1000:.0f}ms")
+                self._backoff = backoff
+            elif self._latency < self._baseline * _BACKOFF_RATIO / 2 and self._backoff:
+                self._backoff = self._backoff / 2 if self._backoff > _MIN_BACKOFF_INTERVAL else 0.0
+
+    @contextmanager
+    def listing(self) -> Iterator[float]:
+        """
+        列出目录前获取速率与并发配额，产出等待时长，退出时记录列出耗时
+        """
+        start = time.monotonic()
+        with self._lock:
+            interval = max(self._interval, self._backoff)
+            wait = self._next_time - start
+            self._next_time = max(self._next_time, start) + interval
+        self.__wait(wait)
+        if self._semaphore:
+            self._semaphore.acquire()
+        listed = time.monotonic()
+        try:
+            yield listed - start
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+            if self._adaptive:
+                self.__observe(time.monotonic() - listed)
+
+    @contextmanager
+    def operation(self) -> Iterator[float]:
+        """
+        删除等其它操作只受并发数限制，产出等待时长
+        """
+        if not self._semaphore:
+            yield 0.0
+            return
+        start = time.monotonic()
+        self._semaphore.acquire()
+        try:
+            yield time.monotonic() - start
+        finally:
+            self._semaphore.release()
+
+
+def parse_io_limits(text: Optional[str]) -> Dict[str, Tuple[float, int]]:
+    """
+    解析按清理目录单独设置的限速，每行格式：路径|每秒列出数|并发数，留空的项使用全局设置
+    返回: {规范化路径: (每秒列出数, 并发数)}，未设置的项为-1
+    """
+    limits = {}
+    for line in (text or "").split("\n"):
+        parts = [part.strip() for part in line.split("|")]
+        if not parts[0]:
+            continue
+        values = []
+        for part in parts[1:3]:
+            try:
+                values.append(max(float(part), 0) if part else -1)
+            except ValueError:
+                logger.warning(f"限速设置格式错误，已忽略：{line.strip()}")
+                values = None
+                break
+        if values is None:
+            continue
+        values += [-1] * (2 - len(values))
+        limits[os.path.normpath(parts[0])] = (values[0], int(values[1]))
+    return limits
@@ -0,0 +1,172 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock, Timer
+from typing import Callable, List, Optional, Set
+
+from app.log import logger
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+except ImportError:
+    Observer = None
+    PollingObserver = None
+
+# 监控模式
+WATCH_NATIVE = "native"
+WATCH_POLLING = "polling"
+# 轮询模式的扫描间隔（秒）
+_POLLING_INTERVAL = 60
+# 插件自身删除的目录在此时间内产生的事件忽略（秒）
+_IGNORE_SECONDS = 60
+
+
+class Debouncer:
+    """
+    事件防抖，事件停止到达 delay 秒后批量回调，持续有事件时最迟 max_delay 秒回调一次
+    """
+
+    def __init__(self, delay: float, max_delay: float, callback: Callable[[Set[str]], None]):
+        self._delay = delay
+        self._max_delay = max(max_delay, delay)
+        self._callback = callback
+        self._lock = Lock()
+        self._pending: Set[str] = set()
+        self._first_time: Optional[float] = None
+        self._timer: Optional[Timer] = None
+
+    def add(self, path: str):
+        with self._lock:
+            now = time.monotonic()
+            self._pending.add(path)
+            if self._first_time is None:
+                self._first_time = now
+            if self._timer:
+                self._timer.cancel()
+            wait = min(self._delay, self._max_delay - (now - self._first_time))
+            self._timer = Timer(max(wait, 0), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            self._first_time = None
+            self._timer = None
+        if paths:
+            try:
+                self._callback(paths)
+            except Exception as e:
+                logger.error(f"实时清理出错：{str(e)}")
+
+    def cancel(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = None
+            self._pending.clear()
+            self._first_time = None
+
+
+class _EventHandler:
+    """
+    只关注删除与移出事件，记录受影响的父目录，插件自身删除产生的事件忽略
+    """
+
+    def __init__(self, debouncer: Debouncer, is_ignored: Callable[[str], bool]):
+        self._debouncer = debouncer
+        self._is_ignored = is_ignored
+
+    def dispatch(self, event):
+        if event.event_type not in ("deleted", "moved"):
+            return
+        src_path = os.fsdecode(event.src_path)
+        if event.event_type == "deleted" and self._is_ignored(src_path):
+            return
+        self._debouncer.add(os.path.dirname(src_path))
+
+
+class FolderWatcher:
+    """
+    监控清理目录下的删除与移出事件，防抖后回调受影响的目录集合
+    默认使用系统原生监控（inotify等），启动失败时不回退；轮询需要定期保存整个目录树的快照，只在明确选择时使用
+    """
+
+    def __init__(self, roots: List[str], callback: Callable[[Set[str]], None],
+                 mode: str = WATCH_NATIVE, debounce: float = 10):
+        """
+        :param roots: 监控的根目录
+        :param callback: 回调，参数为受影响的目录集合
+        :param mode: 监控模式，native 或 polling
+        :param debounce: 防抖时间（秒）
+        """
+        self._roots = roots
+        self._mode = mode
+        self._debouncer = Debouncer(debounce, debounce * 6, callback)
+        self._observer = None
+        # 插件自身删除的目录: {路径: 过期时间}，按登记顺序即过期顺序排列
+        self._ignored: "OrderedDict[str, float]" = OrderedDict()
+        self._ignored_lock = Lock()
+
+    def ignore(self, path: str):
+        """
+        登记插件自身删除的目录，其删除事件不再触发检查
+        """
+        now = time.monotonic()
+        with self._ignored_lock:
+            while self._ignored and next(iter(self._ignored.values())) < now:
+                self._ignored.popitem(last=False)
+            self._ignored[path] = now + _IGNORE_SECONDS
+            self._ignored.move_to_end(path)
+
+    def __is_ignored(self, path: str) -> bool:
+        with self._ignored_lock:
+            expires = self._ignored.get(path)
+        return expires is not None and expires >= time.monotonic()
+
+    def __start_observer(self, polling: bool):
+        if polling:
+            observer = PollingObserver(timeout=_POLLING_INTERVAL)
+        else:
+            observer = Observer()
+        handler = _EventHandler(self._debouncer, self.__is_ignored)
+        for root in self._roots:
+            observer.schedule(handler, root, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def start(self) -> bool:
+        """
+        启动监控，返回是否成功
+        """
+        if Observer is None:
+            logger.error("未安装 watchdog，无法启用实时监控")
+            return False
+        polling = self._mode == WATCH_POLLING
+        try:
+            self.__start_observer(polling=polling)
+        except Exception as e:
+            if polling:
+                logger.error(f"目录轮询监控启动失败：{str(e)}")
+            else:
+                # inotify 数量上限、网络共享等情况下原生监控不可用，轮询整个目录树的开销更大，不自动回退
+                logger.error(f"原生目录监控启动失败，实时监控已关闭，可调大 fs.inotify.max_user_watches "
+                             f"或改用定时清理：{str(e)}")
+            return False
+        logger.info(f"空文件夹{'轮询' if polling else '实时'}监控已启动：{', '.join(self._roots)}")
+        return True
+
+    def stop(self):
+        """
+        停止监控，丢弃未处理的事件
+        """
+        self._debouncer.cancel()
+        if self._observer:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception as e:
+                logger.error(f"停止目录监控出错：{str(e)}")
+            self._observer = None
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 插件测试不依赖 MoviePilot 主程序，使用基准测试的最小替身
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path[:0] = [os.path.join(_REPO_DIR, "benchmarks", "emptyfoldercleaner", "fakeapp"),
+                os.path.join(_REPO_DIR, "plugins.v2")]
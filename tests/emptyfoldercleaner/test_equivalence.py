@@ -0,0 +1,96 @@
+import os
+import posixpath
+
+import pytest
+
+from emptyfoldercleaner.scanner import EmptyFolderScanner
+from emptyfoldercleaner.storage import LocalStorage, MemoryStorage, StorageScanner
+
+# 相对清理根目录的目录与文件
+_DIRS = [
+    "empty",
+    "nested/a/b/c",
+    "nested/d",
+    "mixed/keep",
+    "mixed/drop/x",
+    "excluded/inner",
+    "movie/season 1/extras",
+]
+_FILES = [
+    "mixed/keep/movie.mkv",
+    "movie/season 1/episode.mkv",
+    "top.nfo",
+]
+
+
+def _exclude_excluded(path: str, name: str) -> bool:
+    return name == "excluded"
+
+
+def _memory_exists(backend: MemoryStorage, path: str) -> bool:
+    parent = posixpath.dirname(path)
+    if backend.exists(path):
+        return True
+    return backend.exists(parent) and posixpath.basename(path) in {entry.name for entry in backend.list_dir(parent)}
+
+
+def _memory_run(**kwargs):
+    backend = MemoryStorage(workers=2)
+    for rel in _DIRS:
+        backend.add_dir(posixpath.join("/root", rel))
+    for rel in _FILES:
+        backend.add_file(posixpath.join("/root", rel))
+    try:
+        removed = list(StorageScanner(backend, **kwargs).iter_scan("/root"))
+        remaining = {rel for rel in _DIRS + _FILES if _memory_exists(backend, posixpath.join("/root", rel))}
+    finally:
+        backend.close()
+    return {posixpath.relpath(path, "/root") for path in removed}, remaining
+
+
+def _make_tree(root: str):
+    for rel in _DIRS:
+        os.makedirs(os.path.join(root, rel))
+    for rel in _FILES:
+        open(os.path.join(root, rel), "w").close()
+
+
+def _local_result(root: str, removed):
+    remaining = {rel for rel in _DIRS + _FILES if os.path.lexists(os.path.join(root, rel))}
+    return {os.path.relpath(path, root).replace(os.sep, "/") for path in removed}, remaining
+
+
+def _local_run(root: str, **kwargs):
+    _make_tree(root)
+    backend = LocalStorage(workers=2)
+    try:
+        removed = list(StorageScanner(backend, **kwargs).iter_scan(root))
+    finally:
+        backend.close()
+    return _local_result(root, removed)
+
+
+def _engine_run(root: str, **kwargs):
+    _make_tree(root)
+    removed = list(EmptyFolderScanner(**kwargs).iter_scan(root))
+    return _local_result(root, removed)
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"recursive": False},
+    {"dry_run": True},
+    {"is_excluded": _exclude_excluded},
+], ids=["recursive", "non-recursive", "dry-run", "excluded"])
+def test_backends_match_local_engine(tmp_path, options):
+    # 内存存储、本地存储后端与本地扫描引擎对同一目录树的清理结果一致
+    expected = _engine_run(str(tmp_path / "engine"), **options)
+    assert _memory_run(**options) == expected
+    assert _local_run(str(tmp_path / "local"), **options) == expected
+
+
+def test_recursive_removes_nested_empty_folders(tmp_path):
+    removed, remaining = _memory_run()
+    assert {"empty", "nested", "nested/a/b/c", "mixed/drop", "movie/season 1/extras"} <= removed
+    assert {"mixed/keep/movie.mkv", "movie/season 1/episode.mkv", "top.nfo"} <= remaining
+    assert "mixed" not in removed
@@ -0,0 +1,68 @@
+import errno
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from emptyfoldercleaner.storage import MoviePilotStorage
+
+
+class _FakeItem:
+    def __init__(self, path: str, item_type: str = "dir"):
+        self.path = path
+        self.name = Path(path).name
+        self.type = item_type
+
+
+class _FakeChain:
+    """
+    StorageChain 替身，list_files 返回预设结果，记录删除的目录
+    """
+    listing = None
+
+    def __init__(self):
+        self.deleted = []
+
+    def get_file_item(self, storage: str, path: Path):
+        return _FakeItem(str(path))
+
+    def list_files(self, item):
+        return self.listing
+
+    def delete_file(self, item) -> bool:
+        self.deleted.append(item.path)
+        return True
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    chain_module = types.ModuleType("app.chain.storage")
+    chain_module.StorageChain = _FakeChain
+    monkeypatch.setitem(sys.modules, "app.chain", types.ModuleType("app.chain"))
+    monkeypatch.setitem(sys.modules, "app.chain.storage", chain_module)
+    backend = MoviePilotStorage("alist", workers=1)
+    yield backend
+    backend.close()
+
+
+def test_remove_dir_keeps_folder_when_listing_fails(storage):
+    # 存储模块列出失败时返回 None，不能当作空目录连同内容一起删除
+    storage._chain.listing = None
+    results = storage.remove_dirs(["/media/a"])
+    assert results["/media/a"].errno == errno.EIO
+    assert storage._chain.deleted == []
+
+
+def test_remove_dir_keeps_non_empty_folder(storage):
+    storage._chain.listing = [_FakeItem("/media/a/movie.mkv", "file")]
+    results = storage.remove_dirs(["/media/a"])
+    assert results["/media/a"].errno == errno.ENOTEMPTY
+    assert storage._chain.deleted == []
+
+
+def test_remove_dir_deletes_empty_folder(storage):
+    storage._chain.listing = []
+    results = storage.remove_dirs(["/media/a"])
+    assert results["/media/a"] is None
+    assert storage._chain.deleted == ["/media/a"]